@@ -1,19 +1,75 @@
+import functools
+from typing import Callable, Optional
+
 import pandas as pd
 import streamlit as st
 
-from filters import filter_activities
-from load_data import load_data
-from metrics import (
-    get_activities,
-    get_days_without_activity,
-    get_summable_metrics,
-    select_metric_and_drop_zeros,
+import instrumentation
+from athletes import (
+    DEFAULT_ATHLETE,
+    AthleteStore,
+    Dataset,
+    athlete_name,
+    unpack_uploads,
+)
+from cached import (
+    aggregate_over_time_cached,
+    build_best_effort_index_cached,
+    build_daily_cube_cached,
+    build_fitness_model_cached,
+    build_metric_flags_cached,
+    build_rest_day_engine_cached,
+    get_activities_cached,
+    get_activity_database,
+    get_aggregate_memo,
+    get_athlete_store,
+)
+from best_efforts import RACE_DISTANCES, best_efforts
+from cube import compare_rollup, rollup
+from fitness import ACUTE_DAYS, CHRONIC_DAYS
+from fitness import COLUMNS as FITNESS_COLUMNS
+from instrumentation import Run, stage
+from metrics import get_summable_metrics_from_flags
+from plots import aggregation_bar_plot, resolution_bar_plot
+from rolling import ACUTE_WINDOW, CHRONIC_WINDOW, WINDOWS, daily_load, rolling_load
+from rest_days import (
+    RestDayEngine,
+    Streak,
+    get_rest_days,
+    longest_rest_streak,
+    longest_training_streak,
+    monthly_streak_histogram,
 )
-from plots import aggregation_bar_plot
+from sqlite_store import ActivityDatabase
+
+
+def profiled_fragment(run_every: Optional[int] = None) -> Callable:
+    # A change to a widget of a fragment only reruns the fragment, which is
+    # profiled as a run of its own named after it. In a full rerun the
+    # fragment is one of the stages of the run instead.
+    def decorate(func: Callable) -> Callable:
+        @st.fragment(run_every=run_every)
+        @functools.wraps(func)
+        def fragment(*args, **kwargs):
+            if instrumentation.in_run():
+                with stage(func.__name__):
+                    return func(*args, **kwargs)
+
+            instrumentation.begin_run(func.__name__)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                run = instrumentation.end_run()
+                if run is not None:
+                    fragment_debug(run)
 
+        return fragment
 
-def get_user_data_section() -> pd.DataFrame:
-    st.subheader("Upload Garmin CSV file")
+    return decorate
+
+
+def get_user_data_section() -> list[Dataset]:
+    st.subheader("Upload Garmin CSV files")
     with st.expander("Don't have a CSV file yet?"):
         st.markdown(
             "If you don’t have a CSV file yet, follow the steps below to export your own activity data from Garmin Connect:\n"
@@ -21,22 +77,87 @@ def get_user_data_section() -> pd.DataFrame:
             "2. Set Garmin Connect's language to **Swedish** (the app currently only reads Swedish CSV files).\n"
             "3. Scroll to the bottom of your activity list to load **all activities**.\n"
             "4. Click **Exportera CSV** to download your file.\n"
+            "\n"
+            "Several exports can be uploaded at once. Activities that appear in "
+            "more than one of them are only counted once.\n"
+            "\n"
+            "To compare athletes, put the athlete's name in front of the file "
+            "name of their exports, e.g. `Anna-Activities-26-02-11.csv`. A zip "
+            "archive of exports can be uploaded instead of the files.\n"
         )
-    csv_file = st.file_uploader("Garmin CSV file", type="csv")
+    csv_files = st.file_uploader(
+        "Garmin CSV files", type=["csv", "zip"], accept_multiple_files=True
+    )
 
-    if csv_file is None:
-        return None
+    if not csv_files:
+        return []
+
+    exports: dict[str, list] = {}
+    for csv_file in sorted(unpack_uploads(csv_files), key=lambda f: f.name):
+        athlete = athlete_name(csv_file.name, DEFAULT_ATHLETE) or DEFAULT_ATHLETE
+        exports.setdefault(athlete, []).append(csv_file)
+
+    athletes = list(exports)
+    if len(athletes) > 1:
+        # Only the selected athletes are parsed
+        athletes = st.multiselect(
+            "Athletes to compare",
+            athletes,
+            default=athletes[:2],
+            placeholder="Select athletes",
+        )
+        if not athletes:
+            st.warning("Select at least one athlete.")
+
+    # Exports are parsed in the background. The dashboard shows the ones
+    # that are done and is rerun as more of them finish.
+    store = get_athlete_store()
+    with stage("load_datasets"):
+        available = [
+            store.get_available(athlete, exports[athlete]) for athlete in athletes
+        ]
+    datasets = [dataset for dataset, _ in available if dataset is not None]
+    parsed = sum(count for _, count in available)
+    total = sum(len(exports[athlete]) for athlete in athletes)
+    if parsed < total:
+        parse_progress(store, [exports[athlete] for athlete in athletes], parsed)
+
+    if len(exports) > 1:
+        st.caption(
+            f"Loaded athletes use {store.used_bytes / 2**20:.1f} MB of "
+            f"{store.max_bytes / 2**20:.0f} MB."
+        )
+    return datasets
 
-    return load_data(csv_file)
 
+@profiled_fragment(run_every=1)
+def parse_progress(store: AthleteStore, exports: list[list], parsed: int) -> None:
+    now_parsed = sum(store.parsed_count(sources) for sources in exports)
+    if now_parsed > parsed:
+        st.rerun()
+    total = sum(len(sources) for sources in exports)
+    st.progress(parsed / total, text=f"Reading exports, {parsed} of {total} done...")
 
-def activity_metrics_over_time_section(df: pd.DataFrame) -> None:
+
+@profiled_fragment()
+def activity_metrics_over_time_section(datasets: list[Dataset]) -> None:
     st.header("Activity metrics over time")
 
     col1, col2 = st.columns(2)
 
+    # Only datasets of all their exports go into the database, the ones of
+    # exports still being parsed are summed from their cubes meanwhile
+    db = get_activity_database()
+    if db is not None and all(dataset.complete for dataset in datasets):
+        with stage("import_datasets"):
+            for dataset in datasets:
+                db.import_dataset(dataset.key, dataset.df)
+    else:
+        db = None
+
     with col1:
-        activities = get_activities(df)
+        with stage("get_activities"):
+            activities = _union_activities(datasets, db)
         default = activities[0] if len(activities) > 0 else None
         selected_activities = st.multiselect(
             "Activity type",
@@ -48,8 +169,8 @@ def activity_metrics_over_time_section(df: pd.DataFrame) -> None:
     has_selection = len(selected_activities) > 0
 
     with col2:
-        filtered_df = filter_activities(df, selected_activities)
-        valid_metrics = get_summable_metrics(filtered_df)
+        with stage("summable_metrics"):
+            valid_metrics = _valid_metrics(datasets, selected_activities, db)
 
         selected_metric = st.selectbox(
             "Metric",
@@ -60,22 +181,195 @@ def activity_metrics_over_time_section(df: pd.DataFrame) -> None:
         st.warning("Select at least one activity type to generate a plot.")
         return
 
-    df = filter_activities(df, selected_activities)
+    if selected_metric is None:
+        st.warning("The selected activity types have no metric that can be summed.")
+        return
+
+    if db is not None:
+        if len(datasets) == 1:
+            resolution_bar_plot(
+                lambda freq: db.aggregate(
+                    datasets[0].key, selected_activities, selected_metric, freq
+                ),
+                key="metrics_resolution",
+            )
+        else:
+            resolution_bar_plot(
+                lambda freq: db.compare_aggregate(
+                    {dataset.athlete: dataset.key for dataset in datasets},
+                    selected_activities,
+                    selected_metric,
+                    freq,
+                ),
+                stack=False,
+                key="metrics_resolution",
+            )
+        return
+
+    with stage("daily_cube"):
+        cubes = {
+            dataset.athlete: build_daily_cube_cached(dataset) for dataset in datasets
+        }
+
+    if len(cubes) == 1:
+        (cube,) = cubes.values()
+        resolution_bar_plot(
+            lambda freq: rollup(cube, selected_activities, selected_metric, freq),
+            key="metrics_resolution",
+        )
+    else:
+        resolution_bar_plot(
+            lambda freq: compare_rollup(
+                cubes, selected_activities, selected_metric, freq
+            ),
+            stack=False,
+            key="metrics_resolution",
+        )
+
+
+def _union_activities(
+    datasets: list[Dataset], db: Optional[ActivityDatabase] = None
+) -> list[str]:
+    activities: dict[str, None] = {}
+    for dataset in datasets:
+        if db is None:
+            activities.update(
+                dict.fromkeys(get_activities_cached(dataset.key, dataset.df))
+            )
+        else:
+            activities.update(dict.fromkeys(db.get_activities(dataset.key)))
+    return list(activities)
+
+
+def _valid_metrics(
+    datasets: list[Dataset],
+    activities: list[str],
+    db: Optional[ActivityDatabase] = None,
+) -> list[str]:
+    # When comparing, a metric has to be summable for every athlete that did
+    # any of the selected activities
+    valid = None
+    for dataset in datasets:
+        if db is None:
+            flags = build_metric_flags_cached(dataset)
+            if not any(a in flags.has_na.index for a in activities):
+                continue
+            metrics = get_summable_metrics_from_flags(flags, activities)
+        else:
+            done = db.get_activities(dataset.key)
+            if not any(a in done for a in activities):
+                continue
+            metrics = db.get_summable_metrics(dataset.key, activities)
+        valid = metrics if valid is None else [m for m in valid if m in metrics]
+    return valid or []
+
+
+@profiled_fragment()
+def training_load_section(datasets: list[Dataset]) -> None:
+    st.header("Training load")
+
+    dataset = _select_dataset(datasets, key="training_load_athlete")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        activities = get_activities_cached(dataset.key, dataset.df)
+        selected_activities = st.multiselect(
+            "Activity type",
+            activities,
+            default=activities,
+            placeholder="Select activity types",
+            key="training_load_activities",
+        )
+    with col2:
+        valid_metrics = _valid_metrics([dataset], selected_activities)
+        # A keyed selectbox keeps its value when its options change, even a
+        # None from when there were no options, so it is reset to the default
+        if st.session_state.get("training_load_metric") not in valid_metrics:
+            st.session_state.pop("training_load_metric", None)
+        # Time is recorded for every activity, which makes it the most
+        # comparable measure of load
+        selected_metric = st.selectbox(
+            "Metric",
+            valid_metrics,
+            index=valid_metrics.index("Tid") if "Tid" in valid_metrics else 0,
+            key="training_load_metric",
+        )
+
+    if not selected_activities or selected_metric is None:
+        st.warning("Select activity types with a metric that can be summed.")
+        return
+
+    with stage("rolling_load"):
+        cube = build_daily_cube_cached(dataset)
+        load = rolling_load(daily_load(cube, selected_activities, selected_metric))
+
+    latest = load.iloc[-1]
+    columns = st.columns(len(WINDOWS) + 1)
+    for column, window in zip(columns, WINDOWS):
+        column.metric(f"{window}-day mean", f"{latest[f'{window}-day mean']:.1f}")
+    columns[-1].metric(
+        "ACWR",
+        "–" if pd.isna(latest["ACWR"]) else f"{latest['ACWR']:.2f}",
+        help=f"{ACUTE_WINDOW}-day mean divided by {CHRONIC_WINDOW}-day mean",
+    )
+
+    st.line_chart(load[[f"{window}-day mean" for window in WINDOWS]])
+    st.line_chart(load["ACWR"])
+
+
+def _select_dataset(datasets: list[Dataset], key: str) -> Dataset:
+    if len(datasets) == 1:
+        return datasets[0]
+    athlete = st.selectbox("Athlete", [d.athlete for d in datasets], key=key)
+    return next(d for d in datasets if d.athlete == athlete)
+
+
+@profiled_fragment()
+def fitness_section(datasets: list[Dataset]) -> None:
+    st.header("Fitness and fatigue")
+
+    dataset = _select_dataset(datasets, key="fitness_athlete")
 
-    metric_data = select_metric_and_drop_zeros(df, selected_metric)
+    with stage("fitness_model"):
+        model = build_fitness_model_cached(dataset)
 
-    aggregation_bar_plot(metric_data)
+    if len(model) == 0:
+        st.warning("No activities to compute fitness from.")
+        return
+
+    latest = model.iloc[-1]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Fitness (CTL)", f"{latest['CTL']:.0f}")
+    col2.metric("Fatigue (ATL)", f"{latest['ATL']:.0f}")
+    col3.metric("Form (TSB)", f"{latest['TSB']:.0f}")
+    st.caption(
+        f"Daily Training Stress Score, averaged over {CHRONIC_DAYS} days for "
+        f"fitness and {ACUTE_DAYS} days for fatigue. Activities without a score "
+        "count their Aerobisk Training Effect times hours instead."
+    )
+
+    st.line_chart(
+        model[FITNESS_COLUMNS].rename(
+            columns={
+                "CTL": "Fitness (CTL)",
+                "ATL": "Fatigue (ATL)",
+                "TSB": "Form (TSB)",
+            }
+        )
+    )
 
 
-def rest_days_section(df: pd.DataFrame):
+@profiled_fragment()
+def rest_days_section(datasets: list[Dataset]):
     st.header("Rest days")
 
-    # This has to be done before filtering the df, since the full period is
-    # desired regardless of which activities are selected
-    start_date = df.index.min()
-    end_date = df.index.max()
+    # The full period is used regardless of which activities are ignored.
+    # Compared athletes share one period.
+    start_date = min(dataset.df.index.min() for dataset in datasets)
+    end_date = max(dataset.df.index.max() for dataset in datasets)
 
-    activities = get_activities(df)
+    with stage("get_activities"):
+        activities = _union_activities(datasets)
     rest_activities = st.multiselect(
         "Activities to ignore when counting rest days",
         activities,
@@ -86,28 +380,257 @@ def rest_days_section(df: pd.DataFrame):
         "Days containing only these activities will still be counted as rest days."
     )
 
-    rest_set = set(rest_activities)
-    active_activities = [
-        activity for activity in activities if activity not in rest_set
-    ]
+    with stage("rest_days"):
+        engines = {
+            dataset.athlete: build_rest_day_engine_cached(dataset)
+            for dataset in datasets
+        }
+        rest_days = {
+            athlete: get_rest_days(engine, rest_activities)
+            for athlete, engine in engines.items()
+        }
+
+    with stage("streaks"):
+        rest_streaks = {
+            athlete: longest_rest_streak(engine, rest_activities)
+            for athlete, engine in engines.items()
+        }
+        training_streaks = {
+            athlete: longest_training_streak(engine, rest_activities)
+            for athlete, engine in engines.items()
+        }
+
+    if len(datasets) == 1:
+        (dataset,) = datasets
+        col1, col2 = st.columns(2)
+        col1.metric(
+            "Longest rest streak",
+            f"{rest_streaks[dataset.athlete].length} days",
+            help=_streak_help(rest_streaks[dataset.athlete]),
+        )
+        col2.metric(
+            "Longest training streak",
+            f"{training_streaks[dataset.athlete].length} days",
+            help=_streak_help(training_streaks[dataset.athlete]),
+        )
+
+        aggregation_bar_plot(
+            rest_days[dataset.athlete],
+            start_date,
+            end_date,
+            key="rest_days_resolution",
+        )
+    else:
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Longest rest streak": [s.length for s in rest_streaks.values()],
+                    "Longest training streak": [
+                        s.length for s in training_streaks.values()
+                    ],
+                },
+                index=pd.Index(list(engines), name="Athlete"),
+            )
+        )
+        resolution_bar_plot(
+            lambda freq: pd.DataFrame(
+                {
+                    athlete: _rest_days_over_period(
+                        engine, rest_days[athlete], freq, start_date, end_date
+                    )
+                    for athlete, engine in engines.items()
+                }
+            ),
+            stack=False,
+            key="rest_days_resolution",
+        )
+
+    with st.expander("Rest streaks per month"):
+        st.caption("Number of rest streaks of each length, by the month they began.")
+        athlete = datasets[0].athlete
+        if len(datasets) > 1:
+            athlete = st.selectbox("Athlete", list(engines))
+        with stage("streak_histogram"):
+            st.bar_chart(monthly_streak_histogram(engines[athlete], rest_activities))
+
+
+@profiled_fragment()
+def personal_bests_section(datasets: list[Dataset]) -> None:
+    st.header("Personal bests")
+
+    dataset = _select_dataset(datasets, key="personal_bests_athlete")
+    activities = get_activities_cached(dataset.key, dataset.df)
+    if not activities:
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        activity = st.selectbox(
+            "Activity type",
+            activities,
+            index=activities.index("Löpning") if "Löpning" in activities else 0,
+            key="personal_bests_activity",
+        )
+    with col2:
+        distance = st.selectbox(
+            "Distance", [*RACE_DISTANCES, "Custom"], key="personal_bests_distance"
+        )
+    with col3:
+        n = st.number_input("Number of efforts", 1, 100, 10)
+
+    if distance == "Custom":
+        col1, col2 = st.columns(2)
+        min_distance = col1.number_input("From (km)", 0.0, value=9.8, step=0.1)
+        max_distance = col2.number_input("To (km)", 0.0, value=10.5, step=0.1)
+    else:
+        min_distance, max_distance = RACE_DISTANCES[distance]
+        st.caption(f"Activities between {min_distance} and {max_distance} km.")
+
+    by = st.radio(
+        "Fastest by",
+        ["Tid", "Medeltempo"],
+        format_func={"Tid": "Time", "Medeltempo": "Pace"}.get,
+        horizontal=True,
+    )
+
+    with stage("best_efforts"):
+        index = build_best_effort_index_cached(dataset)
+        efforts = best_efforts(index, activity, min_distance, max_distance, n, by)
+
+    if len(efforts) == 0:
+        st.info("No activities in this distance range.")
+        return
+
+    st.dataframe(
+        pd.DataFrame(
+            {
+                "Distans": efforts["Distans"].round(2).to_numpy(),
+                "Tid": efforts["Tid"].map(_format_duration).to_numpy(),
+                "Medeltempo": efforts["Medeltempo"].map(_format_duration).to_numpy(),
+            },
+            index=efforts.index.strftime("%Y-%m-%d %H:%M"),
+        )
+    )
+
 
-    df = filter_activities(df, active_activities)
+def _format_duration(duration: pd.Timedelta) -> str:
+    if pd.isna(duration):
+        return ""
+    seconds = int(duration.total_seconds())
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def _rest_days_over_period(
+    engine: RestDayEngine,
+    rest_days: pd.Series,
+    freq: str,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+) -> pd.Series:
+    # Days before an athlete's first activity or after their last aren't rest
+    # days, so the buckets of the shared period without any of their days
+    # are left empty rather than counted as no rest
+    counts = aggregate_over_time_cached(rest_days, freq, start, end)
+    covered = aggregate_over_time_cached(
+        pd.Series(1, index=engine.days), freq, start, end
+    )
+    return counts.where(covered > 0)
 
-    rest_days = get_days_without_activity(df, start_date, end_date)
 
-    aggregation_bar_plot(rest_days, start_date, end_date)
+def _streak_help(streak: Streak) -> Optional[str]:
+    if streak.length == 0:
+        return None
+    return f"Started {streak.start:%Y-%m-%d}"
+
+
+def _stage_table(run: Run) -> None:
+    stages = pd.DataFrame(
+        {
+            "Calls": [stats.calls for stats in run.stages.values()],
+            "Time (ms)": [stats.seconds * 1000 for stats in run.stages.values()],
+            "Peak (MiB)": [stats.peak_bytes / 2**20 for stats in run.stages.values()],
+        },
+        index=pd.Index(list(run.stages), name="Stage"),
+    )
+    st.dataframe(
+        stages.sort_values("Time (ms)", ascending=False),
+        column_config={
+            "Time (ms)": st.column_config.NumberColumn(format="%.1f"),
+            "Peak (MiB)": st.column_config.NumberColumn(format="%.2f"),
+        },
+    )
+
+
+def fragment_debug(run: Run) -> None:
+    # Fragments can't draw in the sidebar, so the panel lists their latest
+    # reruns on the next full rerun and the fragment shows its own below it
+    st.session_state.setdefault("fragment_runs", {})[run.name] = run
+    with st.expander("Debug"):
+        st.caption(f"Last rerun of {run.name} took {run.seconds * 1000:.0f} ms")
+        _stage_table(run)
+
+
+def debug_panel(run: Run) -> None:
+    with st.sidebar:
+        st.subheader("Debug")
+        st.caption(f"Last rerun took {run.seconds * 1000:.0f} ms")
+        _stage_table(run)
+
+        fragment_runs = st.session_state.get("fragment_runs", {})
+        if fragment_runs:
+            st.caption("Latest reruns of single sections")
+            st.dataframe(
+                pd.DataFrame(
+                    {
+                        "Started": [r.started for r in fragment_runs.values()],
+                        "Time (ms)": [r.seconds * 1000 for r in fragment_runs.values()],
+                    },
+                    index=pd.Index(list(fragment_runs), name="Section"),
+                ),
+                column_config={
+                    "Time (ms)": st.column_config.NumberColumn(format="%.1f"),
+                },
+            )
+
+        memo = get_aggregate_memo().stats()
+        lookups = memo.hits + memo.misses
+        st.caption(
+            f"Aggregate memo: {memo.hits} hits, {memo.misses} misses "
+            f"({memo.hits / lookups if lookups else 0:.0%} hit rate), "
+            f"{memo.evictions} evictions, {memo.entries} entries using "
+            f"{memo.used_bytes / 2**20:.2f} MiB."
+        )
 
 
 def main():
     st.title("Garmin activity analyzer")
 
-    df = get_user_data_section()
-    if df is None:
-        return
+    instrumentation.begin_run()
+    try:
+        datasets = get_user_data_section()
+        if not datasets:
+            return
+
+        # The sections are fragments, so a change to one of their widgets
+        # only reruns that section
+        activity_metrics_over_time_section(datasets)
+
+        training_load_section(datasets)
+
+        fitness_section(datasets)
 
-    activity_metrics_over_time_section(df)
+        rest_days_section(datasets)
 
-    rest_days_section(df)
+        personal_bests_section(datasets)
+    finally:
+        # Timings only cover the rerun itself, not drawing the panel
+        run = instrumentation.end_run()
+        if run is not None:
+            debug_panel(run)
 
 
 if __name__ == "__main__":
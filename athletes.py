@@ -0,0 +1,335 @@
+import hashlib
+import io
+import os
+import re
+import sys
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, fields, is_dataclass
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from compact import DASHBOARD_COLUMNS, compact_frame
+from load_data import CsvSource, activity_keys, read_source_bytes
+from lru import BoundedLRU
+from parquet_cache import content_key, load_data_cached
+
+DEFAULT_ATHLETE = "Me"
+DEFAULT_MAX_BYTES = int(
+    os.environ.get("GARMIN_STATS_ATHLETE_BUDGET", 256 * 1024 * 1024)
+)
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+MAX_SOURCE_KEYS = 1024
+
+# Garmin names exports "Activities-yy-mm-dd.csv". Other athletes' exports are
+# kept next to them with the athlete's name as a prefix.
+EXPORT_PATTERN = re.compile(r"^(?:(?P<athlete>.+)-)?Activities-[\d-]+\.csv$")
+
+
+def athlete_name(file_name: str, default: str) -> Optional[str]:
+    match = EXPORT_PATTERN.match(os.path.basename(file_name))
+    if match is None:
+        return None
+    return match.group("athlete") or default
+
+
+def chain_keys(source_keys: list[str]) -> str:
+    # Every merge of several exports gets its own key, chained from the keys
+    # of the exports in the order they are merged
+    key = None
+    for source_key in source_keys:
+        if key is None:
+            key = source_key
+        else:
+            key = hashlib.sha256(f"{key}+{source_key}".encode()).hexdigest()
+    return key
+
+
+def unpack_uploads(files: list) -> list:
+    # Zip archives of exports are replaced by the CSV files in them, named
+    # like the files inside so that the athlete can be told from the name
+    sources = []
+    for file in files:
+        if not file.name.lower().endswith(".zip"):
+            sources.append(file)
+            continue
+        with zipfile.ZipFile(io.BytesIO(read_source_bytes(file))) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(".csv"):
+                    continue
+                source = io.BytesIO(archive.read(info))
+                source.name = os.path.basename(info.filename)
+                if getattr(file, "file_id", None):
+                    source.file_id = f"{file.file_id}/{info.filename}"
+                sources.append(source)
+    return sources
+
+
+def parse_export(source: CsvSource) -> pd.DataFrame:
+    # Only the columns the dashboard keeps are converted, or read from the
+    # cache
+    return load_data_cached(source, columns=DASHBOARD_COLUMNS)
+
+
+def merge_exports(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    # Like load_data with a history, activities of later exports that are
+    # already in the earlier ones are dropped
+    return extend_merge(frames[0], frames[1:])[0]
+
+
+def extend_merge(
+    merged: pd.DataFrame, frames: list[pd.DataFrame]
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # Merges more exports into merged like merge_exports, and also gives the
+    # activities that were new
+    new = []
+    for df in frames:
+        is_new = ~activity_keys(df).isin(activity_keys(merged)).to_numpy()
+        if not is_new.any():
+            continue
+        new.append(df[is_new])
+        merged = pd.concat([merged, df[is_new]])
+        # Keep the newest first order of the Garmin exports
+        merged = merged.sort_index(ascending=False, kind="stable")
+    return merged, pd.concat(new) if new else merged.iloc[:0]
+
+
+def load_compact(sources: list[CsvSource]) -> pd.DataFrame:
+    return compact_frame(
+        merge_exports([parse_export(source) for source in sources]), prune=True
+    )
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def object_bytes(value: Any) -> int:
+    # Roughly what the structures built from a frame hold on to, which are
+    # dataclasses of frames, indexes, arrays and containers of them
+    if isinstance(value, pd.DataFrame):
+        return frame_bytes(value)
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if is_dataclass(value):
+        return sum(object_bytes(getattr(value, f.name)) for f in fields(value))
+    if isinstance(value, dict):
+        return sum(object_bytes(k) + object_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(object_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    athlete: str
+    key: str
+    df: pd.DataFrame
+    # False while some of the athlete's exports are still being parsed
+    complete: bool = True
+
+
+@dataclass
+class _Entry:
+    df: pd.DataFrame
+    # Structures built from df by their name, see AthleteStore.derived
+    derived: dict[str, Any] = field(default_factory=dict)
+
+
+# Keeps the parsed datasets of many athletes within a memory budget. An
+# athlete's exports are only parsed the first time the athlete is displayed,
+# and the least recently displayed frames are dropped when the budget is
+# exceeded. A dropped athlete is parsed again when displayed, which the
+# Parquet cache makes cheap.
+#
+# Structures built from a frame, like its daily cube, are kept with it by
+# derived. They count against the same budget and are dropped with the frame.
+#
+# Exports can also be parsed in the background, each on its own worker, with
+# get_available giving the dataset of the exports that are done so far. A
+# finished export is stored like a dataset of its own right away, so it is
+# within the budget whether or not anyone asks for it again. When a dataset
+# grows by more exports, the derived structures that have an extender are
+# extended with the new activities instead of built again.
+class AthleteStore:
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        load: Callable[[list[CsvSource]], pd.DataFrame] = load_compact,
+        parse: Callable[[CsvSource], pd.DataFrame] = parse_export,
+        workers: int = DEFAULT_WORKERS,
+        extenders: Optional[dict[str, Callable[[Any, pd.DataFrame], Any]]] = None,
+    ):
+        self.load = load
+        self.parse = parse
+        self.extenders = extenders or {}
+        self._entries = BoundedLRU(max_bytes=max_bytes)
+        # Guards the parses, and adding derived structures to an entry
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="parse"
+        )
+        # Background parses by the content key of their export, until the
+        # export's frame is stored or the error is raised by get_available
+        self._parses: dict[str, Future] = {}
+        # Content keys of uploads by their file_id, so that the bytes of an
+        # upload are only hashed once
+        self._source_keys = BoundedLRU(max_entries=MAX_SOURCE_KEYS)
+
+    def get(self, athlete: str, sources: list[CsvSource]) -> Dataset:
+        key = chain_keys(self.source_keys(sources))
+        entry = self._entries.get(key)
+        if entry is not None:
+            return Dataset(athlete, key, entry.df)
+
+        # Parsed without holding the lock, so other sessions aren't blocked
+        df = self._store(key, self.load(sources))
+        return Dataset(athlete, key, df)
+
+    def get_available(
+        self, athlete: str, sources: list[CsvSource]
+    ) -> tuple[Optional[Dataset], int]:
+        # The dataset of the exports parsed so far, in the order of sources,
+        # and how many of them that is. None until the first one is done.
+        source_keys = self.source_keys(sources)
+        key = chain_keys(source_keys)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return Dataset(athlete, key, entry.df), len(sources)
+
+        frames = {}
+        with self._lock:
+            for source, source_key in zip(sources, source_keys):
+                entry = self._entries.get(source_key)
+                future = self._parses.get(source_key)
+                if entry is not None:
+                    frames[source_key] = entry.df
+                elif future is None:
+                    # Not parsed yet, or its frame was dropped meanwhile
+                    self._parses[source_key] = self._executor.submit(
+                        self._parse_and_store, source, source_key
+                    )
+                elif future.done():
+                    # Raised here, and parsed again on the next call
+                    del self._parses[source_key]
+                    future.result()
+
+        if not frames:
+            return None, 0
+        done_keys = list(frames)
+        done_key = chain_keys(done_keys)
+        entry = self._entries.get(done_key)
+        df = entry.df if entry is not None else None
+        # The largest dataset of the first of these exports that is stored,
+        # e.g. the one given by the previous call
+        n_base = next(
+            (
+                n
+                for n in range(len(done_keys) - 1, 0, -1)
+                if chain_keys(done_keys[:n]) in self._entries
+            ),
+            0,
+        )
+        base_key = chain_keys(done_keys[:n_base]) if n_base else None
+        base = self._entries.get(base_key) if n_base else None
+        if df is None and base is None:
+            df = compact_frame(merge_exports(list(frames.values())), prune=True)
+            df = self._store(done_key, df)
+        elif df is None:
+            merged, new = extend_merge(base.df, list(frames.values())[n_base:])
+            df = self._store(done_key, compact_frame(merged, prune=True))
+            self._extend_derived(base, done_key, compact_frame(new, prune=True))
+            if n_base > 1:
+                # A partial merge, which nobody asks for once it has grown
+                self._entries.pop(base_key)
+        if len(frames) == len(sources) and len(sources) > 1:
+            # Only needed to merge the exports, which is done now
+            for source_key in done_keys:
+                self._entries.pop(source_key)
+        return (
+            Dataset(athlete, done_key, df, complete=len(frames) == len(sources)),
+            len(frames),
+        )
+
+    def derived(
+        self, dataset: Dataset, name: str, build: Callable[[pd.DataFrame], Any]
+    ) -> Any:
+        entry = self._entries.get(dataset.key)
+        if entry is not None and name in entry.derived:
+            return entry.derived[name]
+
+        value = build(dataset.df)
+        # Not kept if the frame was dropped meanwhile, it is built again when
+        # the dataset is loaded again
+        if entry is not None:
+            value = self._add_derived(dataset.key, entry, {name: value})[name]
+        return value
+
+    def _extend_derived(self, base: _Entry, key: str, new: pd.DataFrame) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        # Extended without holding the lock, like derived builds
+        extended = {
+            name: self.extenders[name](value, new)
+            for name, value in dict(base.derived).items()
+            if name in self.extenders
+        }
+        self._add_derived(key, entry, extended)
+
+    def _add_derived(self, key: str, entry: _Entry, values: dict[str, Any]) -> dict:
+        with self._lock:
+            size = 0
+            for name, value in values.items():
+                if name not in entry.derived:
+                    entry.derived[name] = value
+                    size += object_bytes(value)
+            self._entries.grow(key, size)
+            return {name: entry.derived[name] for name in values}
+
+    def parsed_count(self, sources: list[CsvSource]) -> int:
+        # Failed parses count as done, so that get_available raises them
+        source_keys = self.source_keys(sources)
+        if chain_keys(source_keys) in self._entries:
+            return len(sources)
+        with self._lock:
+            return sum(
+                source_key in self._entries
+                or (source_key in self._parses and self._parses[source_key].done())
+                for source_key in source_keys
+            )
+
+    def source_keys(self, sources: list[CsvSource]) -> list[str]:
+        keys = []
+        for source in sources:
+            file_id = getattr(source, "file_id", None)
+            key = self._source_keys.get(file_id) if file_id else None
+            if key is None:
+                key = content_key(read_source_bytes(source))
+                if file_id:
+                    self._source_keys.put(file_id, key, 0)
+            keys.append(key)
+        return keys
+
+    def _parse_and_store(self, source: CsvSource, source_key: str) -> None:
+        df = compact_frame(self.parse(source), prune=True)
+        with self._lock:
+            self._store(source_key, df)
+            del self._parses[source_key]
+
+    def _store(self, key: str, df: pd.DataFrame) -> pd.DataFrame:
+        # The frame another session stored meanwhile wins
+        return self._entries.put(key, _Entry(df), frame_bytes(df)).df
+
+    @property
+    def max_bytes(self) -> int:
+        return self._entries.max_bytes
+
+    @property
+    def used_bytes(self) -> int:
+        return self._entries.used_bytes
@@ -0,0 +1,117 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from load_data import load_data  # noqa: E402
+
+SOURCE = (
+    Path(__file__).resolve().parent.parent / "tests" / "testfiles" / "activities.csv"
+)
+
+
+def min_sec_to_deltatime_format(s: int) -> str:
+    return "00:" + str(s)
+
+
+# The parser as it was before the column schema, kept as the baseline
+def legacy_load_data(csv_path: str) -> pd.DataFrame:
+    df = pd.read_csv(csv_path, decimal=".", thousands=",", na_values=["--"])
+
+    str_cols = ["Aktivitetstyp", "Namn", "Medelkontakttidsbalans"]
+    for col in str_cols:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip()
+
+    df["Favorit"] = (
+        df["Favorit"].astype(str).str.lower().map({"true": True, "false": False})
+    )
+    df["Dekompression"] = (
+        df["Dekompression"].astype(str).str.strip().map({"Ja": True, "Nej": False})
+    )
+
+    df["Datum"] = pd.to_datetime(df["Datum"], errors="coerce")
+    df = df.set_index("Datum")
+
+    meter_activities = ["Simbassäng", "Simning"]
+    mask = df["Aktivitetstyp"].isin(meter_activities)
+    df.loc[mask, "Distans"] = df.loc[mask, "Distans"] / 1000.0
+
+    min_sec_cols = ["Medeltempo", "Bästa tempo"]
+    for col in min_sec_cols:
+        if col in df.columns:
+            df[col] = df[col].map(min_sec_to_deltatime_format)
+
+    time_cols = [
+        "Tid",
+        "Medeltempo",
+        "Bästa tempo",
+        "Medelvärde GAP",
+        "Bästa varvtid",
+        "Start för stress",
+        "Slut för stress",
+        "Färdtid",
+        "Total tid",
+    ]
+    for col in time_cols:
+        if col in df.columns:
+            df[col] = pd.to_timedelta(df[col], errors="coerce")
+
+    hour_format_cols = ["Tid", "Färdtid", "Total tid"]
+    for col in hour_format_cols:
+        if col in df.columns:
+            df[col] = df[col].dt.total_seconds() / 3600
+
+    return df
+
+
+def write_scaled_csv(path: Path, rows: int) -> None:
+    with open(SOURCE, encoding="utf-8") as f:
+        header, *lines = f.readlines()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header)
+        for i in range(rows):
+            f.write(lines[i % len(lines)])
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the schema driven parser with the legacy parser."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "activities.csv"
+        write_scaled_csv(path, args.rows)
+
+        candidates = {
+            "legacy": lambda: legacy_load_data(path),
+            "schema (c)": lambda: load_data(path),
+            "schema (pyarrow)": lambda: load_data(path, engine="pyarrow"),
+        }
+        timings = {name: best_of(args.repeat, fn) for name, fn in candidates.items()}
+
+    baseline = timings["legacy"]
+    print(f"{args.rows:,} rows, best of {args.repeat}")
+    for name, seconds in timings.items():
+        print(f"{name:<20}{seconds:8.2f} s{baseline / seconds:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from schema import COLUMNS  # noqa: E402
+
+# Rough activity mix of the exports in csv_files/
+ACTIVITY_MIX = {
+    "Löpning": 0.25,
+    "Styrketräning": 0.25,
+    "Konditionspass": 0.2,
+    "Cykling": 0.06,
+    "Inomhuscykling": 0.05,
+    "Löpband": 0.05,
+    "Annan": 0.04,
+    "Simbassäng": 0.035,
+    "Gång": 0.03,
+    "Tennis": 0.015,
+    "Simning": 0.005,
+    "Yoga": 0.005,
+    "Vandring": 0.005,
+}
+DISTANCE_ACTIVITIES = {"Löpning", "Cykling", "Löpband", "Gång", "Vandring"}
+SWIM_ACTIVITIES = {"Simbassäng", "Simning"}
+MISSING = "--"
+
+
+def _clock(seconds: np.ndarray) -> np.ndarray:
+    seconds = seconds.astype("int64")
+    return np.char.add(
+        np.char.add(np.char.zfill((seconds // 3600).astype(str), 2), ":"),
+        np.char.add(
+            np.char.add(np.char.zfill((seconds // 60 % 60).astype(str), 2), ":"),
+            np.char.zfill((seconds % 60).astype(str), 2),
+        ),
+    )
+
+
+def _min_sec(seconds: np.ndarray) -> np.ndarray:
+    seconds = seconds.astype("int64")
+    return np.char.add(
+        np.char.add((seconds // 60).astype(str), ":"),
+        np.char.zfill((seconds % 60).astype(str), 2),
+    )
+
+
+def _thousands(values: np.ndarray) -> np.ndarray:
+    return np.array([f"{value:,}" for value in values.astype("int64")], dtype=object)
+
+
+def _with_missing(
+    rng: np.random.Generator, values: np.ndarray, share: float
+) -> np.ndarray:
+    values = values.astype(object)
+    values[rng.random(len(values)) < share] = MISSING
+    return values
+
+
+def generate_dates(
+    rng: np.random.Generator, rows: int, end: str = "2026-02-08", years: int = 10
+) -> pd.DatetimeIndex:
+    # Spread over a fixed period, newest first like Garmin. Large sizes stand
+    # for club-wide exports, so they get more activities per day rather than
+    # a longer history.
+    span = int(pd.Timedelta(days=365 * years).total_seconds())
+    seconds_back = np.sort(rng.integers(0, span, size=rows))
+    return pd.Timestamp(end) - pd.to_timedelta(seconds_back, unit="s")
+
+
+def generate_activities(
+    rows: int,
+    seed: int = 0,
+    end: str = "2026-02-08",
+    years: int = 10,
+    row_offset: int = 0,
+    dates: Optional[pd.DatetimeIndex] = None,
+) -> pd.DataFrame:
+    # dates are drawn for these rows alone unless given, e.g. as a slice of
+    # the dates of a whole file that is written in chunks
+    rng = np.random.default_rng(seed + row_offset)
+    activities = np.array(list(ACTIVITY_MIX))
+    weights = np.array(list(ACTIVITY_MIX.values()))
+    kinds = rng.choice(activities, size=rows, p=weights / weights.sum())
+    has_distance = np.isin(kinds, list(DISTANCE_ACTIVITIES))
+    is_swim = np.isin(kinds, list(SWIM_ACTIVITIES))
+    is_run = np.isin(kinds, ["Löpning", "Löpband"])
+
+    if dates is None:
+        dates = generate_dates(rng, rows, end, years)
+
+    duration = rng.gamma(4, 900, size=rows)
+    distance = np.where(has_distance, duration / 3600 * rng.uniform(6, 25, rows), 0)
+    # Swims are exported in meters
+    distance = np.where(is_swim, np.round(duration / 3600 * 2500, -1), distance)
+    pace = np.where(distance > 0, duration / np.maximum(distance, 0.01), 0)
+    calories = np.round(duration / 3600 * rng.uniform(300, 900, rows))
+    steps = np.where(is_run, np.round(duration * rng.uniform(2.3, 3.0, rows)), 0)
+
+    n = rows
+    columns = {
+        "Aktivitetstyp": kinds,
+        "Datum": dates.strftime("%Y-%m-%d %H:%M:%S"),
+        "Favorit": np.where(rng.random(n) < 0.05, "true", "false"),
+        "Namn": np.char.add(kinds.astype(str), " "),
+        "Distans": np.where(
+            is_swim,
+            distance.astype("int64").astype(str),
+            np.round(distance, 2).astype(str),
+        ),
+        "Kalorier": _thousands(calories),
+        "Tid": _clock(duration),
+        "Medelpuls": _with_missing(rng, rng.integers(90, 170, n), 0.05),
+        "Maxpuls": _with_missing(rng, rng.integers(120, 195, n), 0.05),
+        "Aerobisk Training Effect": np.round(rng.uniform(0, 5, n), 1).astype(str),
+        "Medeltempo": np.where(has_distance & (pace > 0), _min_sec(pace), MISSING),
+        "Bästa tempo": np.where(
+            has_distance & (pace > 0), _min_sec(pace * 0.7), MISSING
+        ),
+        "Total stigning": _with_missing(rng, rng.integers(0, 400, n), 0.4),
+        "Totalt nedför": _with_missing(rng, rng.integers(0, 400, n), 0.4),
+        "Medelkontakttidsbalans": np.where(
+            is_run, "50.6% vänster/49.4% höger", MISSING
+        ),
+        "Medelvärde GAP": np.where(is_run & (pace > 0), _min_sec(pace * 0.98), MISSING),
+        "Training Stress Score®": _with_missing(
+            rng, np.round(duration / 3600 * rng.uniform(30, 110, n), 1), 0.3
+        ),
+        "Totalt antal årtag": np.where(
+            is_swim, _thousands(np.round(distance * 0.6)), MISSING
+        ),
+        "Steg": np.where(steps > 0, _thousands(steps), MISSING),
+        "Dekompression": "Nej",
+        "Bästa varvtid": _clock(duration / rng.integers(1, 20, n)),
+        "Antal varv": rng.integers(1, 20, n).astype(str),
+        "Färdtid": _clock(duration * 0.9),
+        "Total tid": _clock(duration * 1.02),
+    }
+
+    frame = {}
+    for name in COLUMNS:
+        if name in columns:
+            frame[name] = columns[name]
+        else:
+            # Remaining numeric columns are mostly missing, like in real exports
+            frame[name] = _with_missing(rng, np.round(rng.uniform(0, 100, n), 1), 0.7)
+    return pd.DataFrame(frame)
+
+
+def write_csv(path: Path, rows: int, seed: int = 0, chunk_rows: int = 500_000) -> None:
+    # The dates of the whole file are drawn up front, so that it is newest
+    # first across the chunks
+    dates = generate_dates(np.random.default_rng(seed), rows)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for offset in range(0, max(rows, 1), chunk_rows):
+            n = min(chunk_rows, rows - offset)
+            chunk = generate_activities(
+                n, seed, row_offset=offset, dates=dates[offset : offset + n]
+            )
+            # Garmin quotes every value except the first three columns; quoting
+            # everything is close enough for the parser
+            chunk.to_csv(f, header=offset == 0, index=False, quoting=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic Swedish Garmin activity export."
+    )
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_csv(args.path, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
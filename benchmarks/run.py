@@ -0,0 +1,167 @@
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from filters import filter_activities  # noqa: E402
+from generate import write_csv  # noqa: E402
+from load_data import load_data  # noqa: E402
+from metrics import (  # noqa: E402
+    aggregate_over_time,
+    get_days_without_activity,
+    get_summable_metrics,
+    select_metric_and_drop_zeros,
+)
+from streaming import load_daily_aggregates  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+FREQS = ["D", "W", "ME", "YE"]
+SELECTION = ["Löpning", "Cykling", "Simbassäng"]
+
+
+def measure(fn: Callable[[], object], repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    # Peak memory gets its own run, since tracing slows down allocations
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": min(timings), "peak_bytes": peak}
+
+
+def stages(path: Path) -> dict[str, Callable[[], object]]:
+    df = load_data(path)
+    selected = filter_activities(df, SELECTION)
+    metric_data = select_metric_and_drop_zeros(selected, "Distans")
+    start, end = df.index.min(), df.index.max()
+
+    result = {
+        "load_data": lambda: load_data(path),
+        "load_daily_aggregates": lambda: load_daily_aggregates(path),
+        "filter_activities": lambda: filter_activities(df, SELECTION),
+        "get_summable_metrics": lambda: get_summable_metrics(selected),
+    }
+    for freq in FREQS:
+        result[f"aggregate_over_time[{freq}]"] = lambda freq=freq: aggregate_over_time(
+            metric_data, freq
+        )
+    result["get_days_without_activity"] = lambda: get_days_without_activity(
+        selected, start, end
+    )
+    return result
+
+
+def run(sizes: list[int], data_dir: Path, repeat: int) -> list[dict]:
+    data_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for rows in sizes:
+        path = data_dir / f"activities-{rows}.csv"
+        if not path.exists():
+            print(f"Generating {rows:,} rows...", file=sys.stderr)
+            write_csv(path, rows)
+
+        for stage, fn in stages(path).items():
+            # Loading a large file once is slow enough, timing it once is fine
+            stage_repeat = (
+                1 if stage.startswith("load_") and rows >= 1_000_000 else repeat
+            )
+            result = {"rows": rows, "stage": stage, **measure(fn, stage_repeat)}
+            results.append(result)
+            print(
+                f"{rows:>12,} {stage:<30}{result['seconds']:10.4f} s"
+                f"{result['peak_bytes'] / 2**20:10.1f} MiB",
+                file=sys.stderr,
+            )
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline_path: Path) -> None:
+    with open(baseline_path) as f:
+        baseline = {(r["rows"], r["stage"]): r for r in json.load(f)["results"]}
+
+    print(f"{'rows':>12} {'stage':<30}{'time':>10}{'memory':>10}")
+    for result in results:
+        before = baseline.get((result["rows"], result["stage"]))
+        if before is None:
+            continue
+        time_ratio = result["seconds"] / before["seconds"]
+        memory_ratio = result["peak_bytes"] / max(before["peak_bytes"], 1)
+        print(
+            f"{result['rows']:>12,} {result['stage']:<30}"
+            f"{time_ratio:9.2f}x{memory_ratio:9.2f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time the load/filter/aggregate pipeline on synthetic exports."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Row counts"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=ROOT / "benchmarks" / "data",
+        help="Where generated exports are kept between runs",
+    )
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument(
+        "--compare", type=Path, help="JSON results of an earlier run to compare with"
+    )
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.data_dir, args.repeat)
+
+    report = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare is not None:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from filters import ActivityIndex
+
+# Columns an effort can be ranked by, lower is faster for both
+RANK_COLUMNS = ["Tid", "Medeltempo"]
+
+# Distance ranges in km that count as an attempt at the usual race distances
+RACE_DISTANCES = {
+    "5 km": (4.9, 5.3),
+    "10 km": (9.8, 10.5),
+    "Half marathon": (20.9, 21.6),
+    "Marathon": (41.9, 43.0),
+}
+
+
+# The activities of one type sorted by distance, with what they are ranked
+# by attached. The activities within any distance range are a contiguous
+# block, found by binary search.
+@dataclass(frozen=True)
+class Efforts:
+    distance: np.ndarray
+    start: np.ndarray
+    # Hours, like Tid
+    time: np.ndarray
+    # Seconds per km, NaN where the pace is missing
+    pace: np.ndarray
+
+
+@dataclass(frozen=True)
+class BestEffortIndex:
+    efforts: dict[str, Efforts]
+
+
+def build_best_effort_index(index: ActivityIndex) -> BestEffortIndex:
+    df = index.df
+    distance = df["Distans"].to_numpy(dtype="float64", na_value=np.nan)
+    time = df["Tid"].to_numpy(dtype="float64", na_value=np.nan)
+    if "Medeltempo" in df.columns:
+        pace = pd.to_timedelta(df["Medeltempo"]).dt.total_seconds().to_numpy()
+    else:
+        pace = np.full(len(df), np.nan)
+    start = df.index.to_numpy()
+
+    efforts = {}
+    for activity, (first, last) in index.bounds.items():
+        block = slice(first, last)
+        # Activities without a distance or a time can't be an effort
+        keep = np.flatnonzero(
+            (distance[block] > 0) & ~np.isnan(time[block]) & (time[block] > 0)
+        )
+        order = keep[np.argsort(distance[block][keep], kind="stable")]
+        efforts[activity] = Efforts(
+            distance[block][order],
+            start[block][order],
+            time[block][order],
+            pace[block][order],
+        )
+    return BestEffortIndex(efforts)
+
+
+def best_efforts(
+    index: BestEffortIndex,
+    activity: str,
+    min_distance: float,
+    max_distance: float,
+    n: int = 10,
+    by: str = "Tid",
+) -> pd.DataFrame:
+    efforts = index.efforts.get(activity)
+    if efforts is None:
+        return _efforts_frame([], [], [], [])
+
+    lo = np.searchsorted(efforts.distance, min_distance, side="left")
+    hi = np.searchsorted(efforts.distance, max_distance, side="right")
+
+    if by == "Tid":
+        keys = efforts.time[lo:hi]
+    elif by == "Medeltempo":
+        keys = efforts.pace[lo:hi]
+    else:
+        raise ValueError(f"Can't rank efforts by {by}")
+    # Missing paces go last
+    keys = np.where(np.isnan(keys), np.inf, keys)
+
+    # Only the n best of the range are put in order
+    n = min(n, len(keys))
+    if n == 0:
+        return _efforts_frame([], [], [], [])
+    best = np.argpartition(keys, n - 1)[:n] if n < len(keys) else np.arange(n)
+    best = lo + best[np.argsort(keys[best], kind="stable")]
+
+    return _efforts_frame(
+        efforts.start[best],
+        efforts.distance[best],
+        efforts.time[best],
+        efforts.pace[best],
+    )
+
+
+def _efforts_frame(start, distance, time, pace) -> pd.DataFrame:
+    time = pd.to_timedelta(np.asarray(time, dtype="float64"), unit="h")
+    pace = pd.to_timedelta(np.asarray(pace, dtype="float64"), unit="s")
+    return pd.DataFrame(
+        {
+            "Distans": np.asarray(distance, dtype="float64"),
+            # Hours can't hold whole seconds exactly, float32 ones even less
+            "Tid": time.round("s"),
+            "Medeltempo": pace,
+        },
+        index=pd.DatetimeIndex(start, name="Datum"),
+    )
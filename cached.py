@@ -0,0 +1,103 @@
+import os
+from typing import Optional
+
+import pandas as pd
+import streamlit as st
+
+from athletes import AthleteStore, Dataset
+from best_efforts import BestEffortIndex, build_best_effort_index
+from cube import DailyCube, build_daily_cube, extend_cube
+from fitness import add_activities, daily_training_load, fitness_model
+from filters import ActivityIndex, build_activity_index
+from memo import AggregateMemo
+from metrics import MetricFlags, build_metric_flags, get_activities
+from rest_days import RestDayEngine, build_rest_day_engine, extend_rest_day_engine
+from sqlite_store import ActivityDatabase
+
+# Streamlit re-runs the whole script on every widget interaction. The
+# functions below memoize the expensive steps, so that a rerun only pays for
+# what actually changed. Frames and the structures built from them live in
+# the athlete store, and aggregates in the aggregate memo, two LRUs shared by
+# the whole server that each stay within a memory budget. Streamlit's own
+# caches only hold those two, the activity database and the small activity
+# lists, which are keyed by the dataset key since arguments prefixed with an
+# underscore aren't hashed.
+
+
+# One store for the whole server, so that the memory budget covers every
+# session. Datasets are identified by their content, so sessions that upload
+# the same exports share the frames. As more exports are parsed, the cubes,
+# rest day engines and fitness models of the growing datasets are extended
+# with the new activities.
+@st.cache_resource(show_spinner=False)
+def get_athlete_store() -> AthleteStore:
+    return AthleteStore(
+        extenders={
+            "daily_cube": extend_cube,
+            "rest_day_engine": extend_rest_day_engine,
+            "fitness_model": add_activities,
+        }
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def get_activities_cached(key: str, _df: pd.DataFrame) -> list[str]:
+    return get_activities(_df)
+
+
+# The structures built from a dataset are kept with its frame in the athlete
+# store, within its memory budget, however many athletes there are
+def build_activity_index_cached(dataset: Dataset) -> ActivityIndex:
+    return get_athlete_store().derived(dataset, "activity_index", build_activity_index)
+
+
+def build_best_effort_index_cached(dataset: Dataset) -> BestEffortIndex:
+    index = build_activity_index_cached(dataset)
+    return get_athlete_store().derived(
+        dataset, "best_effort_index", lambda df: build_best_effort_index(index)
+    )
+
+
+def build_metric_flags_cached(dataset: Dataset) -> MetricFlags:
+    return get_athlete_store().derived(dataset, "metric_flags", build_metric_flags)
+
+
+# Shared by the whole server like the athlete store. Aggregates are found by
+# the fingerprint of their series, so callers need no key of their own.
+@st.cache_resource(show_spinner=False)
+def get_aggregate_memo() -> AggregateMemo:
+    return AggregateMemo()
+
+
+def aggregate_over_time_cached(
+    s: pd.Series,
+    freq: str,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+) -> pd.Series:
+    return get_aggregate_memo().aggregate(s, freq, start, end)
+
+
+def build_daily_cube_cached(dataset: Dataset) -> DailyCube:
+    return get_athlete_store().derived(dataset, "daily_cube", build_daily_cube)
+
+
+def build_rest_day_engine_cached(dataset: Dataset) -> RestDayEngine:
+    return get_athlete_store().derived(
+        dataset, "rest_day_engine", build_rest_day_engine
+    )
+
+
+def build_fitness_model_cached(dataset: Dataset) -> pd.DataFrame:
+    return get_athlete_store().derived(
+        dataset, "fitness_model", lambda df: fitness_model(daily_training_load(df))
+    )
+
+
+# Opt-in with GARMIN_STATS_DB. The loaded datasets are then also kept in an
+# SQLite database, which the activity metrics chart is aggregated in.
+@st.cache_resource(show_spinner=False)
+def get_activity_database() -> Optional[ActivityDatabase]:
+    if not os.environ.get("GARMIN_STATS_DB"):
+        return None
+    return ActivityDatabase()
@@ -0,0 +1,66 @@
+import os
+from functools import lru_cache
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+# At most this many bars are sent to the browser per chart, however long the
+# history is
+MAX_POINTS = int(os.environ.get("GARMIN_STATS_MAX_CHART_POINTS", 366))
+
+# "sum" merges runs of consecutive periods into one bar each, "window" keeps
+# only the most recent periods
+STRATEGIES = ["sum", "window"]
+STRATEGY = os.environ.get("GARMIN_STATS_CHART_STRATEGY", "sum")
+
+
+def format_labels(index: pd.DatetimeIndex, fmt: str) -> pd.Index:
+    # The periods of an aggregate are a regular range, so the range itself
+    # identifies the labels and reruns reuse them instead of formatting
+    # every date again
+    if index.freq is None or len(index) == 0:
+        return pd.Index(index.strftime(fmt))
+    return _range_labels(index[0], len(index), index.freqstr, fmt)
+
+
+@lru_cache(maxsize=64)
+def _range_labels(first: pd.Timestamp, periods: int, freq: str, fmt: str) -> pd.Index:
+    return pd.Index(pd.date_range(first, periods=periods, freq=freq).strftime(fmt))
+
+
+def cap_points(
+    data: Union[pd.Series, pd.DataFrame],
+    max_points: int = MAX_POINTS,
+    strategy: str = STRATEGY,
+) -> Union[pd.Series, pd.DataFrame]:
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown chart strategy: {strategy}")
+    if len(data) <= max_points:
+        return data
+
+    if strategy == "window":
+        return data.iloc[-max_points:]
+
+    # The buckets are counted from the end so that the most recent bar is a
+    # whole one, only the first bar may cover fewer periods. Each bar is
+    # labelled with its first period.
+    size = -(-len(data) // max_points)
+    buckets = (np.arange(len(data)) + (-len(data)) % size) // size
+    starts = np.flatnonzero(np.diff(buckets, prepend=-1))
+    # Bars of only missing periods, like days outside a compared athlete's
+    # span, stay missing instead of becoming zero
+    summed = data.groupby(buckets, sort=False).sum(min_count=1)
+    summed.index = data.index[starts]
+    return summed
+
+
+def chart_data(
+    data: Union[pd.Series, pd.DataFrame],
+    fmt: str,
+    max_points: int = MAX_POINTS,
+    strategy: str = STRATEGY,
+) -> Union[pd.Series, pd.DataFrame]:
+    # The aggregate with its dates replaced by labels, capped to max_points
+    labelled = data.set_axis(format_labels(data.index, fmt))
+    return cap_points(labelled, max_points, strategy)
@@ -0,0 +1,157 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from athletes import athlete_name
+from cube import build_daily_cube, rollup
+from load_data import load_data
+from metrics import (
+    MetricFlags,
+    aggregate_over_time,
+    build_metric_flags,
+    get_summable_metrics_from_flags,
+)
+from rest_days import build_rest_day_engine, get_rest_days
+from streaming import load_daily_aggregates
+
+# The resolutions of the dashboard's chart tabs
+FREQS = ["D", "W", "ME", "YE"]
+
+
+def group_exports(directory: Path, default_athlete: str) -> dict[str, list[Path]]:
+    groups: dict[str, list[Path]] = {}
+    for path in sorted(Path(directory).glob("*.csv")):
+        athlete = athlete_name(path.name, default_athlete)
+        if athlete is None:
+            continue
+        groups.setdefault(athlete, []).append(path)
+    # The export date in the name sorts oldest first, which is the order the
+    # exports are merged in
+    return groups
+
+
+def aggregate_tables(
+    df: pd.DataFrame, flags: Optional[MetricFlags] = None
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    cube = build_daily_cube(df)
+    if flags is None:
+        flags = build_metric_flags(df)
+
+    frames = []
+    for activity in sorted(cube.activities):
+        for metric in get_summable_metrics_from_flags(flags, [activity]):
+            for freq in FREQS:
+                s = rollup(cube, [activity], metric, freq)
+                frames.append(
+                    pd.DataFrame(
+                        {
+                            "Frequency": freq,
+                            "Aktivitetstyp": activity,
+                            "Metric": metric,
+                            "Datum": s.index,
+                            "Value": s.to_numpy(),
+                        }
+                    )
+                )
+    aggregates = (
+        pd.concat(frames, ignore_index=True)
+        if frames
+        else pd.DataFrame(
+            columns=["Frequency", "Aktivitetstyp", "Metric", "Datum", "Value"]
+        )
+    )
+
+    engine = build_rest_day_engine(df)
+    rest_days = get_rest_days(engine, [])
+    rest_frames = []
+    if len(df) > 0:
+        for freq in FREQS:
+            s = aggregate_over_time(rest_days, freq, df.index.min(), df.index.max())
+            rest_frames.append(
+                pd.DataFrame(
+                    {"Frequency": freq, "Datum": s.index, "Rest days": s.to_numpy()}
+                )
+            )
+    rest = (
+        pd.concat(rest_frames, ignore_index=True)
+        if rest_frames
+        else pd.DataFrame(columns=["Frequency", "Datum", "Rest days"])
+    )
+    return aggregates, rest
+
+
+def process_athlete(athlete: str, paths: list[Path], output_dir: Path) -> int:
+    if len(paths) == 1:
+        # A single export is folded into daily sums chunk by chunk, without
+        # holding all of its rows
+        daily = load_daily_aggregates(paths[0])
+        aggregates, rest = aggregate_tables(daily.df, daily.flags)
+        activities = daily.activities
+    else:
+        df = load_data(list(paths))
+        aggregates, rest = aggregate_tables(df)
+        activities = len(df)
+
+    athlete_dir = Path(output_dir) / athlete
+    athlete_dir.mkdir(parents=True, exist_ok=True)
+    aggregates.to_parquet(athlete_dir / "aggregates.parquet", index=False)
+    rest.to_parquet(athlete_dir / "rest_days.parquet", index=False)
+    return activities
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Precompute aggregate tables for every athlete's Garmin exports."
+    )
+    parser.add_argument("input_dir", type=Path, help="Directory with CSV exports")
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument(
+        "--jobs", type=int, default=os.cpu_count(), help="Worker processes"
+    )
+    parser.add_argument(
+        "--default-athlete",
+        default="default",
+        help="Name used for exports without an athlete prefix",
+    )
+    args = parser.parse_args(argv)
+
+    groups = group_exports(args.input_dir, args.default_athlete)
+    if not groups:
+        print(f"No exports found in {args.input_dir}", file=sys.stderr)
+        return 1
+
+    failed = 0
+    start = time.perf_counter()
+    # One task per athlete, since an athlete's exports are merged into one
+    # dataset before aggregating
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {
+            executor.submit(process_athlete, athlete, paths, args.output_dir): athlete
+            for athlete, paths in groups.items()
+        }
+        for future in as_completed(futures):
+            athlete = futures[future]
+            try:
+                activities = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{athlete}: failed: {e}", file=sys.stderr)
+            else:
+                print(f"{athlete}: done ({activities} activities)", file=sys.stderr)
+
+    print(
+        f"Processed {len(groups) - failed} of {len(groups)} athletes "
+        f"in {time.perf_counter() - start:.1f} s",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
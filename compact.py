@@ -0,0 +1,57 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from metrics import SUMMABLE_COLUMNS
+from schema import COLUMNS
+
+# Columns the dashboard reads besides the summable metrics
+UI_COLUMNS = ["Aktivitetstyp", "Medeltempo"]
+# What a pruned frame keeps
+DASHBOARD_COLUMNS = [*SUMMABLE_COLUMNS, *UI_COLUMNS]
+
+
+def compact_frame(
+    df: pd.DataFrame,
+    prune: bool = False,
+    keep: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    if prune:
+        wanted = set(DASHBOARD_COLUMNS) | set(keep or [])
+        df = df[[col for col in df.columns if col in wanted]]
+
+    columns = {}
+    for col in df.columns:
+        spec = COLUMNS.get(col)
+        columns[col] = df[col]
+        if spec is not None and spec.compact_dtype is not None:
+            columns[col] = _downcast(df[col], spec.compact_dtype)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _downcast(s: pd.Series, dtype: str) -> pd.Series:
+    if dtype == "Int32":
+        values = s.to_numpy(dtype="float64", na_value=np.nan)
+        finite = values[~np.isnan(values)]
+        # Counters that turn out to hold fractions or huge values are only
+        # narrowed to float32
+        integral = np.array_equal(finite, np.round(finite))
+        in_range = len(finite) == 0 or np.abs(finite).max() < np.iinfo("int32").max
+        if not (integral and in_range):
+            dtype = "float32"
+    return s.astype(dtype)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    report = pd.DataFrame(
+        {
+            "before": before.memory_usage(deep=True),
+            "after": after.memory_usage(deep=True),
+        }
+    )
+    # Columns that were pruned use no memory afterwards
+    report = report.fillna(0).astype("int64")
+    report.loc["Total"] = report.sum()
+    report["saved"] = report["before"] - report["after"]
+    return report
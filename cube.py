@@ -0,0 +1,189 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from days import day_positions
+from metrics import SUMMABLE_COLUMNS, aggregation_range
+
+
+# Daily sums of every summable metric per activity type, over every day from
+# the first to the last activity. Charts for any selection of activities,
+# metric and resolution are sliced and rolled up from it instead of
+# resampling the raw rows again.
+@dataclass(frozen=True)
+class DailyCube:
+    days: pd.DatetimeIndex
+    activities: list[str]
+    metrics: list[str]
+    # Shape (days, activities, metrics)
+    values: np.ndarray
+
+
+def build_daily_cube(
+    df: pd.DataFrame, metrics: Optional[list[str]] = None
+) -> DailyCube:
+    if metrics is None:
+        metrics = SUMMABLE_COLUMNS
+    metrics = [col for col in dict.fromkeys(metrics) if col in df.columns]
+
+    codes, activities = pd.factorize(np.asarray(df["Aktivitetstyp"], dtype=object))
+
+    if len(df) == 0:
+        return DailyCube(
+            pd.DatetimeIndex([], freq="D"),
+            [],
+            metrics,
+            np.zeros((0, 0, len(metrics))),
+        )
+
+    positions, days = day_positions(df.index)
+    n_days = len(days)
+    n_activities = len(activities)
+    cell = positions * n_activities + codes
+
+    values = np.empty((n_days * n_activities, len(metrics)))
+    for i, metric in enumerate(metrics):
+        # NaN is skipped like resample().sum() does
+        weights = np.nan_to_num(df[metric].to_numpy(dtype="float64", na_value=np.nan))
+        values[:, i] = np.bincount(cell, weights, minlength=n_days * n_activities)
+
+    return DailyCube(
+        days,
+        list(activities),
+        metrics,
+        values.reshape(n_days, n_activities, len(metrics)),
+    )
+
+
+def extend_cube(cube: DailyCube, df: pd.DataFrame) -> DailyCube:
+    # Adds new activities to a cube. Only the new rows are summed, the days of
+    # the cube are copied over as they are and the range of days grows to
+    # cover both. df must not repeat activities that are already in the cube.
+    # Exports differ in columns, so metrics that only the new rows have are
+    # added too, zero on the days before, like a cube built from both.
+    metrics = [
+        col for col in SUMMABLE_COLUMNS if col in cube.metrics or col in df.columns
+    ] + [col for col in cube.metrics if col not in SUMMABLE_COLUMNS]
+    added = build_daily_cube(df, metrics)
+    if len(added.days) == 0:
+        return cube
+    if len(cube.days) == 0:
+        return added
+
+    first = min(cube.days[0], added.days[0])
+    last = max(cube.days[-1], added.days[-1])
+    days = pd.date_range(first, last, freq="D")
+    activities = cube.activities + [
+        a for a in added.activities if a not in cube.activities
+    ]
+
+    values = np.zeros((len(days), len(activities), len(metrics)))
+    offset = (cube.days[0] - first).days
+    values[
+        np.ix_(
+            np.arange(offset, offset + len(cube.days)),
+            np.arange(len(cube.activities)),
+            [metrics.index(m) for m in cube.metrics],
+        )
+    ] = cube.values
+    offset = (added.days[0] - first).days
+    values[
+        np.ix_(
+            np.arange(offset, offset + len(added.days)),
+            [activities.index(a) for a in added.activities],
+            [metrics.index(m) for m in added.metrics],
+        )
+    ] += added.values
+    return DailyCube(days, activities, metrics, values)
+
+
+def daily_sums(cube: DailyCube, activities: list[str], metric: str) -> np.ndarray:
+    selected = [cube.activities.index(a) for a in activities if a in cube.activities]
+    if not selected or metric not in cube.metrics:
+        return np.zeros(len(cube.days))
+    return cube.values[:, selected, cube.metrics.index(metric)].sum(axis=1)
+
+
+def _bucket_labels(days: np.ndarray, freq: str) -> np.ndarray:
+    if freq == "D":
+        return days
+    if freq == "W":
+        # Weeks end on Sunday. 1970-01-01 was a Thursday.
+        weekday = (days.astype("int64") + 3) % 7
+        return days + (6 - weekday)
+    if freq == "ME":
+        return (days.astype("datetime64[M]") + 1).astype("datetime64[D]") - 1
+    if freq == "YE":
+        return (days.astype("datetime64[Y]") + 1).astype("datetime64[D]") - 1
+    raise ValueError(f"Unsupported frequency: {freq}")
+
+
+def _active_period(
+    cube: DailyCube, sums: np.ndarray
+) -> Optional[tuple[pd.Timestamp, pd.Timestamp]]:
+    # Like aggregate_over_time on select_metric_and_drop_zeros, the default
+    # period runs from the first to the last day with a non-zero value
+    active = np.flatnonzero(sums)
+    if len(active) == 0:
+        return None
+    return cube.days[active[0]], cube.days[active[-1]]
+
+
+def rollup(
+    cube: DailyCube,
+    activities: list[str],
+    metric: str,
+    freq: str,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+) -> pd.Series:
+    sums = daily_sums(cube, activities, metric)
+
+    if start is None or end is None:
+        period = _active_period(cube, sums)
+        if period is None:
+            return pd.Series(
+                [], index=pd.DatetimeIndex([]), dtype="float64", name=metric
+            )
+        if start is None:
+            start = period[0]
+        if end is None:
+            end = period[1]
+
+    target = aggregation_range(start, end, freq)
+    labels = _bucket_labels(cube.days.to_numpy().astype("datetime64[D]"), freq)
+    target_days = target.to_numpy().astype("datetime64[D]")
+
+    position = np.searchsorted(target_days, labels)
+    inside = position < len(target_days)
+    inside[inside] = target_days[position[inside]] == labels[inside]
+
+    out = np.bincount(position[inside], sums[inside], minlength=len(target))
+    return pd.Series(out, index=target, name=metric)
+
+
+def compare_rollup(
+    cubes: dict[str, DailyCube], activities: list[str], metric: str, freq: str
+) -> pd.DataFrame:
+    # One column per cube, over one period that covers the default periods of
+    # all of them
+    periods = [
+        _active_period(cube, daily_sums(cube, activities, metric))
+        for cube in cubes.values()
+    ]
+    periods = [period for period in periods if period is not None]
+    if not periods:
+        return pd.DataFrame(
+            index=pd.DatetimeIndex([]), columns=list(cubes), dtype="float64"
+        )
+
+    start = min(first for first, _ in periods)
+    end = max(last for _, last in periods)
+    return pd.DataFrame(
+        {
+            name: rollup(cube, activities, metric, freq, start, end)
+            for name, cube in cubes.items()
+        }
+    )
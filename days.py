@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+
+def day_numbers(index: pd.DatetimeIndex) -> np.ndarray:
+    # Days since 1970-01-01, which can be subtracted and used as positions
+    return index.normalize().to_numpy().astype("datetime64[D]").astype("int64")
+
+
+def day_range(first_day: int, n_days: int) -> pd.DatetimeIndex:
+    return pd.date_range(
+        pd.Timestamp(np.datetime64(int(first_day), "D")), periods=n_days, freq="D"
+    )
+
+
+def day_positions(index: pd.DatetimeIndex) -> tuple[np.ndarray, pd.DatetimeIndex]:
+    # The position of every timestamp's day in the range from the first to the
+    # last day, and that range. index must not be empty.
+    numbers = day_numbers(index)
+    first_day = numbers.min()
+    return numbers - first_day, day_range(first_day, int(numbers.max() - first_day + 1))
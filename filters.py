@@ -1,3 +1,6 @@
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 
 
@@ -7,3 +10,47 @@ def filter_activities(
 ) -> pd.DataFrame:
     mask = df["Aktivitetstyp"].isin(activities)
     return df.loc[mask].copy()
+
+
+# The rows of a dataset grouped by activity type, built once at load time.
+# Every type occupies one contiguous block of the grouped frame, so selecting
+# types only touches the selected rows.
+@dataclass(frozen=True)
+class ActivityIndex:
+    df: pd.DataFrame
+    bounds: dict[str, tuple[int, int]]
+
+
+def build_activity_index(df: pd.DataFrame) -> ActivityIndex:
+    codes, activities = pd.factorize(np.asarray(df["Aktivitetstyp"], dtype=object))
+    # Stable, so rows keep their original order within a type
+    order = np.argsort(codes, kind="stable")
+    ends = np.cumsum(np.bincount(codes, minlength=len(activities)))
+    starts = ends - np.bincount(codes, minlength=len(activities))
+    bounds = {
+        activity: (int(start), int(end))
+        for activity, start, end in zip(activities, starts, ends)
+    }
+    return ActivityIndex(df.iloc[order], bounds)
+
+
+def select_activities(
+    index: ActivityIndex,
+    activities: list[str],
+    copy: bool = False,
+) -> pd.DataFrame:
+    ranges = sorted(index.bounds[a] for a in set(activities) if a in index.bounds)
+
+    if len(ranges) == 1:
+        # A single block is a slice, which pandas returns as a view
+        start, end = ranges[0]
+        selected = index.df.iloc[start:end]
+    else:
+        positions = np.concatenate(
+            [np.arange(start, end) for start, end in ranges] or [np.arange(0)]
+        )
+        selected = index.df.take(positions)
+
+    # Views share memory with the index, so callers that want to modify the
+    # result have to ask for a copy
+    return selected.copy() if copy else selected
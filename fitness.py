@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from days import day_positions
+
+# Time constants in days of the impulse-response model, as used for CTL and
+# ATL in TrainingPeaks
+CHRONIC_DAYS = 42
+ACUTE_DAYS = 7
+
+# Activities without a Training Stress Score get Aerobisk Training Effect
+# times hours times this as their load. A rough estimate that puts an hour at
+# training effect 3 at about 60 TSS, the load of an hour at tempo pace.
+TRAINING_EFFECT_LOAD_PER_HOUR = 20.0
+
+COLUMNS = ["CTL", "ATL", "TSB"]
+
+
+@dataclass(frozen=True)
+class FitnessState:
+    # The last day the state includes
+    day: pd.Timestamp
+    ctl: float
+    atl: float
+
+
+def activity_load(df: pd.DataFrame) -> pd.Series:
+    tss = _column(df, "Training Stress Score®")
+    fallback = (
+        _column(df, "Aerobisk Training Effect")
+        * _column(df, "Tid")
+        * TRAINING_EFFECT_LOAD_PER_HOUR
+    )
+    return pd.Series(np.where(tss > 0, tss, fallback), index=df.index)
+
+
+def _column(df: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in df.columns:
+        return np.zeros(len(df))
+    return np.nan_to_num(df[name].to_numpy(dtype="float64", na_value=np.nan))
+
+
+def daily_training_load(df: pd.DataFrame) -> pd.Series:
+    if len(df) == 0:
+        return pd.Series([], index=pd.DatetimeIndex([], freq="D"), dtype="float64")
+
+    positions, days = day_positions(df.index)
+    loads = np.bincount(positions, activity_load(df).to_numpy(), minlength=len(days))
+    return pd.Series(loads, index=days, name="Load")
+
+
+def _smooth(loads: np.ndarray, days: int, initial: float) -> np.ndarray:
+    # y[t] = y[t-1] + (load[t] - y[t-1]) / days, the recurrence of an
+    # exponentially weighted mean without adjustment. The state before the
+    # first day is put in front so the recurrence continues from it.
+    values = np.concatenate([[initial], loads])
+    smoothed = pd.Series(values).ewm(alpha=1 / days, adjust=False).mean()
+    return smoothed.to_numpy()
+
+
+def fitness_model(
+    daily_load: pd.Series, initial: Optional[FitnessState] = None
+) -> pd.DataFrame:
+    # daily_load must have a value for every day, like daily_training_load
+    ctl0 = 0.0 if initial is None else initial.ctl
+    atl0 = 0.0 if initial is None else initial.atl
+    loads = np.nan_to_num(daily_load.to_numpy(dtype="float64", na_value=np.nan))
+
+    ctl = _smooth(loads, CHRONIC_DAYS, ctl0)
+    atl = _smooth(loads, ACUTE_DAYS, atl0)
+    return pd.DataFrame(
+        {
+            "CTL": ctl[1:],
+            "ATL": atl[1:],
+            # Form is what the day starts with, before its own training
+            "TSB": ctl[:-1] - atl[:-1],
+            # Kept so that extending the model can tell which days changed
+            "Load": loads,
+        },
+        index=daily_load.index,
+    )
+
+
+def final_state(model: pd.DataFrame) -> Optional[FitnessState]:
+    if len(model) == 0:
+        return None
+    last = model.iloc[-1]
+    return FitnessState(model.index[-1], float(last["CTL"]), float(last["ATL"]))
+
+
+def extend_fitness(model: pd.DataFrame, daily_load: pd.Series) -> pd.DataFrame:
+    # Brings the model up to date with daily_load, which may also cover days
+    # the model already has, e.g. the day a weekly export was taken, whose
+    # later activities only arrive with the next export. The recurrence
+    # restarts from the state before the first day whose load changed, the
+    # days before it are kept. Days without training in between are given
+    # zero load. Like daily_training_load, the model must start from zero.
+    if final_state(model) is None:
+        return fitness_model(daily_load)
+    if len(daily_load) == 0:
+        return model
+
+    days = pd.date_range(
+        min(model.index[0], daily_load.index.min()),
+        max(model.index[-1], daily_load.index.max()),
+        freq="D",
+    )
+    old = model["Load"].reindex(days)
+    new = old.copy()
+    new[daily_load.index] = np.nan_to_num(
+        daily_load.to_numpy(dtype="float64", na_value=np.nan)
+    )
+    new = new.fillna(0.0)
+
+    # Days outside the model are NaN in old and count as changed
+    changed = (new != old).to_numpy()
+    if not changed.any():
+        return model
+    first = int(np.argmax(changed))
+    if first == 0:
+        return fitness_model(new)
+    state = final_state(model.loc[: days[first - 1]])
+    return pd.concat([model.loc[: state.day], fitness_model(new.iloc[first:], state)])
+
+
+def add_activities(model: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    # The model of the activities it was made from and the new ones in df,
+    # which must not repeat any of them
+    load = daily_training_load(df)
+    if final_state(model) is not None:
+        load = model["Load"].add(load, fill_value=0.0)
+    return extend_fitness(model, load)
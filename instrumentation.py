@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Profiling is opt-in, tracing allocations slows down the whole app
+ENABLED = os.environ.get("GARMIN_STATS_PROFILE", "") not in ("", "0")
+LOG_PATH: Optional[Path] = (
+    Path(os.environ["GARMIN_STATS_PROFILE_LOG"])
+    if os.environ.get("GARMIN_STATS_PROFILE_LOG")
+    else None
+)
+
+
+@dataclass
+class StageStats:
+    stage: str
+    calls: int = 0
+    seconds: float = 0.0
+    # Largest amount allocated on top of what was live when the stage started
+    peak_bytes: int = 0
+
+
+@dataclass
+class Run:
+    # "app" for a full rerun, or the name of the fragment that was rerun
+    name: str = "app"
+    started: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+class Profiler:
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.run: Optional[Run] = None
+        self._run_start = 0.0
+        # [memory when the stage started, highest memory seen inside it]
+        self._stack: list[list[int]] = []
+
+    def begin_run(self, name: str = "app") -> Run:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.run = Run(name)
+        self._stack = []
+        self._run_start = time.perf_counter()
+        return self.run
+
+    def end_run(self) -> Optional[Run]:
+        run, self.run = self.run, None
+        if run is not None:
+            run.seconds = time.perf_counter() - self._run_start
+        return run
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if self.run is None:
+            yield
+            return
+
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # tracemalloc only has one peak, so the enclosing stage remembers
+            # its own before the peak is reset for this one
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._stack.append([current, current])
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak_bytes = 0
+            if tracing:
+                started, highest = self._stack.pop()
+                highest = max(highest, tracemalloc.get_traced_memory()[1])
+                peak_bytes = highest - started
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], highest)
+
+            stats = self.run.stages.setdefault(name, StageStats(name))
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.peak_bytes = max(stats.peak_bytes, peak_bytes)
+
+
+# Streamlit runs every session in its own thread, so each gets its own profiler
+_local = threading.local()
+
+
+def get_profiler() -> Optional[Profiler]:
+    return getattr(_local, "profiler", None)
+
+
+def begin_run(name: str = "app") -> Optional[Run]:
+    if not ENABLED:
+        return None
+    profiler = get_profiler()
+    if profiler is None:
+        profiler = _local.profiler = Profiler()
+    return profiler.begin_run(name)
+
+
+def in_run() -> bool:
+    profiler = get_profiler()
+    return profiler is not None and profiler.run is not None
+
+
+def end_run() -> Optional[Run]:
+    profiler = get_profiler()
+    if profiler is None:
+        return None
+    run = profiler.end_run()
+    if run is not None and LOG_PATH is not None:
+        write_jsonl(run, LOG_PATH)
+    return run
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    profiler = get_profiler()
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+def run_record(run: Run) -> dict:
+    return {
+        "name": run.name,
+        "started": run.started,
+        "seconds": run.seconds,
+        "stages": [asdict(stats) for stats in run.stages.values()],
+    }
+
+
+def write_jsonl(run: Run, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run_record(run), ensure_ascii=False) + "\n")
@@ -1,66 +1,342 @@
+import io
+import os
+from typing import IO, Iterator, Optional, Union
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from schema import COLUMNS
+
+# Bump whenever the conversions in load_data or the column schema change, so
+# that cached parses made by an older parser are no longer used.
+PARSER_VERSION = 2
+
+# Garmin writes missing values as "--", and "--:--:--" for missing durations
+NA_VALUES = ["--", "--:--:--"]
 
+CsvSource = Union[str, os.PathLike, bytes, IO[bytes]]
 
-def min_sec_to_deltatime_format(s: int) -> str:
-    return "00:" + str(s)
 
+def read_source_bytes(source: CsvSource) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    # Streamlit's UploadedFile is a BytesIO, which can hand out its buffer
+    # without moving the read position
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    data = source.read()
+    source.seek(0)
+    return data
 
-def load_data(csv_path: str) -> pd.DataFrame:
-    df = pd.read_csv(csv_path, decimal=".", thousands=",", na_values=["--"])
 
-    # Strings
-    str_cols = ["Aktivitetstyp", "Namn", "Medelkontakttidsbalans"]
-    for col in str_cols:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
+def load_data(
+    csv_path: Union[CsvSource, list[CsvSource]],
+    history: Optional[pd.DataFrame] = None,
+    columns: Optional[list[str]] = None,
+    engine: str = "c",
+    lazy: bool = False,
+    dtype_backend: str = "numpy",
+) -> Union[pd.DataFrame, "LazyActivityFrame"]:
+    if dtype_backend not in ("numpy", "pyarrow"):
+        raise ValueError(f"Unknown dtype backend: {dtype_backend}")
+    if lazy and dtype_backend != "numpy":
+        raise ValueError("Lazy frames only support the numpy backend")
+
+    if history is None and not isinstance(csv_path, list):
+        raw = read_raw(csv_path, columns, engine)
+        if lazy:
+            return LazyActivityFrame(raw)
+        df = convert(raw)
+    else:
+        sources = csv_path if isinstance(csv_path, list) else [csv_path]
+        df = history
+        for source in sources:
+            df = merge_export(df, source, columns, engine)
+
+    if dtype_backend == "pyarrow":
+        df = to_arrow_frame(df)
+    return df
+
 
-    # Boolean columns
-    df["Favorit"] = (
-        df["Favorit"].astype(str).str.lower().map({"true": True, "false": False})
+def to_arrow_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # Nulls replace NaN, NaT and the "nan" strings of text columns, activity
+    # types are dictionary encoded and durations, Tid included, become Arrow
+    # durations. Columns outside the schema are left as they are.
+    return pd.DataFrame(
+        {
+            name: COLUMNS[name].to_arrow(df[name]) if name in COLUMNS else df[name]
+            for name in df.columns
+        },
+        index=df.index,
     )
-    df["Dekompression"] = (
-        df["Dekompression"].astype(str).str.strip().map({"Ja": True, "Nej": False})
+
+
+def read_raw(
+    csv_path: CsvSource,
+    columns: Optional[list[str]] = None,
+    engine: str = "c",
+) -> pd.DataFrame:
+    if isinstance(csv_path, bytes):
+        csv_path = io.BytesIO(csv_path)
+
+    if engine == "pyarrow":
+        return _read_raw_pyarrow(csv_path, columns)
+
+    return pd.read_csv(csv_path, **_read_csv_options(columns))
+
+
+def read_raw_chunks(
+    csv_path: CsvSource,
+    columns: Optional[list[str]] = None,
+    chunk_rows: int = 100_000,
+) -> Iterator[pd.DataFrame]:
+    if isinstance(csv_path, bytes):
+        csv_path = io.BytesIO(csv_path)
+    with pd.read_csv(
+        csv_path, chunksize=chunk_rows, **_read_csv_options(columns)
+    ) as reader:
+        yield from reader
+
+
+def _read_csv_options(columns: Optional[list[str]]) -> dict:
+    usecols = None
+    if columns is not None:
+        # The index and the columns needed to fix units are always kept
+        wanted = set(columns) | {"Datum", "Aktivitetstyp"}
+        usecols = lambda name: name in wanted  # noqa: E731
+
+    dtype = {name: spec.read_dtype for name, spec in COLUMNS.items()}
+    return dict(
+        usecols=usecols,
+        dtype=dtype,
+        decimal=".",
+        thousands=",",
+        na_values=NA_VALUES,
     )
 
-    # Datetime
-    df["Datum"] = pd.to_datetime(df["Datum"], errors="coerce")
-    df = df.set_index("Datum")
-
-    # Convert all activity distances to km
-    meter_activities = ["Simbassäng", "Simning"]
-    mask = df["Aktivitetstyp"].isin(meter_activities)
-    # Convert only those rows from meters to km
-    df.loc[mask, "Distans"] = df.loc[mask, "Distans"] / 1000.0
-
-    min_sec_cols = ["Medeltempo", "Bästa tempo"]
-    for col in min_sec_cols:
-        if col in df.columns:
-            df[col] = df[col].map(min_sec_to_deltatime_format)
-
-    # Time/duration columns
-    time_cols = [
-        "Tid",
-        "Medeltempo",
-        "Bästa tempo",
-        "Medelvärde GAP",
-        "Bästa varvtid",
-        "Start för stress",
-        "Slut för stress",
-        "Färdtid",
-        "Total tid",
-    ]
-    for col in time_cols:
-        if col in df.columns:
-            df[col] = pd.to_timedelta(df[col], errors="coerce")
-
-    # Hour format time
-    hour_format_cols = [
-        "Tid",
-        "Färdtid",
-        "Total tid",
-    ]
-    for col in hour_format_cols:
-        if col in df.columns:
-            df[col] = df[col].dt.total_seconds() / 3600
 
-    return df
+def _read_raw_pyarrow(
+    csv_path: CsvSource, columns: Optional[list[str]] = None
+) -> pd.DataFrame:
+    # Arrow's reader is used directly, since read_csv's pyarrow engine neither
+    # strips thousands separators nor applies string dtypes cheaply. Schema
+    # columns are kept as Arrow strings and converted by the parsers like the
+    # text columns of the C engine.
+    if isinstance(csv_path, os.PathLike):
+        csv_path = os.fspath(csv_path)
+    include_columns = None
+    if columns is not None:
+        header = pd.read_csv(csv_path, nrows=0).columns
+        if hasattr(csv_path, "seek"):
+            csv_path.seek(0)
+        wanted = set(columns) | {"Datum", "Aktivitetstyp"}
+        include_columns = [name for name in header if name in wanted]
+    table = pacsv.read_csv(
+        csv_path,
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in COLUMNS},
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+            include_columns=include_columns,
+        ),
+    )
+    raw = table.to_pandas(
+        types_mapper=lambda t: pd.ArrowDtype(t) if t == pa.string() else None
+    )
+    # Columns outside the schema are left as the C engine would infer them
+    for name in raw.columns:
+        if name not in COLUMNS and isinstance(raw[name].dtype, pd.ArrowDtype):
+            raw[name] = raw[name].to_numpy(dtype=object, na_value=np.nan)
+    return raw
+
+
+KEY_COLUMNS = ["Datum", "Aktivitetstyp", "Tid"]
+
+
+# Garmin exports are snapshots of the whole activity history, so consecutive
+# exports mostly repeat each other. An activity is identified by when it
+# started, what it was and how long it lasted.
+def _hash_keys(datum, activity_type, hours) -> pd.Series:
+    keys = pd.DataFrame(
+        {
+            "Datum": datum,
+            "Aktivitetstyp": np.asarray(activity_type, dtype=object),
+            # Whole seconds, so that compact frames with float32 hours still
+            # produce the same keys
+            "Tid": pd.array(np.round(_seconds(hours))).astype("Int64"),
+        }
+    )
+    return pd.util.hash_pandas_object(keys, index=False)
+
+
+def _seconds(hours) -> np.ndarray:
+    if isinstance(getattr(hours, "dtype", None), pd.ArrowDtype):
+        # Tid of frames with the pyarrow backend is a duration
+        return pd.to_timedelta(hours.astype("timedelta64[ms]")).dt.total_seconds()
+    return np.asarray(hours, dtype="float64") * 3600
+
+
+def activity_keys(df: pd.DataFrame) -> pd.Series:
+    return _hash_keys(df.index, df["Aktivitetstyp"], df["Tid"])
+
+
+def _raw_activity_keys(raw: pd.DataFrame) -> pd.Series:
+    # Only the key columns are converted, the same way convert does it, so
+    # that rows already in the history never go through the full conversion
+    return _hash_keys(
+        *(COLUMNS[name].parse(raw[name]).to_numpy() for name in KEY_COLUMNS)
+    )
+
+
+def merge_export(
+    history: Optional[pd.DataFrame],
+    csv_path: CsvSource,
+    columns: Optional[list[str]] = None,
+    engine: str = "c",
+) -> pd.DataFrame:
+    if columns is not None:
+        columns = list(columns) + KEY_COLUMNS
+    raw = read_raw(csv_path, columns, engine)
+    if history is None:
+        return convert(raw)
+
+    is_new = ~_raw_activity_keys(raw).isin(activity_keys(history)).to_numpy()
+    if not is_new.any():
+        return history
+
+    new = convert(raw.loc[is_new].reset_index(drop=True))
+    merged = pd.concat([history, new])
+    # Keep the newest first order of the Garmin exports
+    return merged.sort_index(ascending=False, kind="stable")
+
+
+# Distances of these activities are exported in meters instead of km
+METER_ACTIVITIES = ["Simbassäng", "Simning"]
+
+
+def convert(raw: pd.DataFrame) -> pd.DataFrame:
+    activity_types = COLUMNS["Aktivitetstyp"].parse(raw["Aktivitetstyp"])
+    df = pd.DataFrame(
+        {
+            name: (
+                activity_types
+                if name == "Aktivitetstyp"
+                else convert_column(raw[name], activity_types)
+            )
+            for name in raw.columns
+        }
+    )
+    return df.set_index("Datum")
+
+
+def convert_column(raw_column: pd.Series, activity_types: pd.Series) -> pd.Series:
+    spec = COLUMNS.get(raw_column.name)
+    if spec is None:
+        return raw_column
+    s = spec.parse(raw_column)
+
+    if raw_column.name == "Distans":
+        # Convert only the rows in meters to km
+        in_meters = activity_types.isin(METER_ACTIVITIES).to_numpy()
+        s = s.where(~in_meters, s / 1000.0)
+    return s
+
+
+# Holds the raw columns of an export and converts each column the first time
+# it is read, so that work scales with the columns that are used. Datum and
+# Aktivitetstyp are converted up front, everything needs them. Supports the
+# parts of the DataFrame interface that metrics, filters and the cube use;
+# to_frame converts the rest.
+class LazyActivityFrame:
+    def __init__(self, raw: pd.DataFrame):
+        raw = raw.reset_index(drop=True)
+        index = pd.DatetimeIndex(COLUMNS["Datum"].parse(raw["Datum"]), name="Datum")
+        activity_types = COLUMNS["Aktivitetstyp"].parse(raw["Aktivitetstyp"])
+        self._init(raw.drop(columns="Datum"), index, {"Aktivitetstyp": activity_types})
+
+    def _init(
+        self,
+        raw: pd.DataFrame,
+        index: pd.DatetimeIndex,
+        converted: dict[str, pd.Series],
+    ) -> None:
+        # Converted columns keep the raw frame's RangeIndex, and only get the
+        # Datum index when handed out
+        self._raw = raw
+        self._converted = converted
+        self.index = index
+
+    @classmethod
+    def _from_parts(cls, raw, index, converted) -> "LazyActivityFrame":
+        frame = cls.__new__(cls)
+        frame._init(raw, index, converted)
+        return frame
+
+    @property
+    def columns(self) -> pd.Index:
+        return self._raw.columns
+
+    @property
+    def converted_columns(self) -> list[str]:
+        return list(self._converted)
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0 or len(self.columns) == 0
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _column(self, name: str) -> pd.Series:
+        s = self._converted.get(name)
+        if s is None:
+            s = convert_column(self._raw[name], self._converted["Aktivitetstyp"])
+            self._converted[name] = s
+        return s
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return pd.Series(self._column(key).to_numpy(), index=self.index, name=key)
+        return pd.DataFrame({name: self[name] for name in key}, index=self.index)
+
+    @property
+    def loc(self) -> "_LazyLocIndexer":
+        return _LazyLocIndexer(self)
+
+    def take(self, positions: np.ndarray) -> "LazyActivityFrame":
+        raw = self._raw.take(positions).reset_index(drop=True)
+        converted = {
+            name: s.take(positions).reset_index(drop=True)
+            for name, s in self._converted.items()
+        }
+        return self._from_parts(raw, self.index.take(positions), converted)
+
+    def copy(self) -> "LazyActivityFrame":
+        return self._from_parts(
+            self._raw.copy(),
+            self.index.copy(),
+            {name: s.copy() for name, s in self._converted.items()},
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        return self[list(self.columns)]
+
+
+class _LazyLocIndexer:
+    def __init__(self, frame: LazyActivityFrame):
+        self.frame = frame
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            rows, columns = key
+            if not (isinstance(rows, slice) and rows == slice(None)):
+                return self[rows][columns]
+            return self.frame[columns]
+        # Boolean row masks, like filter_activities uses
+        mask = np.asarray(key, dtype=bool)
+        return self.frame.take(np.flatnonzero(mask))
@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+# Values in least recently used order, each with the number of bytes it
+# holds. The least recently used are dropped when there are more than
+# max_entries of them or they use more than max_bytes together, except the
+# one that was just put or grown, which stays even if it alone is over the
+# budget. Shared between sessions, which run in their own threads.
+class BoundedLRU:
+    def __init__(
+        self, max_bytes: Optional[int] = None, max_entries: Optional[int] = None
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._values: OrderedDict[Hashable, Any] = OrderedDict()
+        self._sizes: dict[Hashable, int] = {}
+        self._used_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        # None if the key isn't there
+        with self._lock:
+            value = self._values.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._values.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int) -> Any:
+        # A value that is already there is kept, and returned instead
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key]
+            self._values[key] = value
+            self._sizes[key] = size
+            self._used_bytes += size
+            self._evict(keep=key)
+            return value
+
+    def grow(self, key: Hashable, size: int) -> None:
+        # For values that hold on to more once they are stored
+        with self._lock:
+            if key not in self._values:
+                return
+            self._sizes[key] += size
+            self._used_bytes += size
+            self._values.move_to_end(key)
+            self._evict(keep=key)
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            if key not in self._values:
+                return None
+            self._used_bytes -= self._sizes.pop(key)
+            return self._values.pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._sizes.clear()
+            self._used_bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._values
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used_bytes
+
+    def _evict(self, keep: Hashable) -> None:
+        for key in list(self._values):
+            if not self._over_budget():
+                break
+            if key != keep:
+                del self._values[key]
+                self._used_bytes -= self._sizes.pop(key)
+                self.evictions += 1
+
+    def _over_budget(self) -> bool:
+        return (self.max_entries is not None and len(self) > self.max_entries) or (
+            self.max_bytes is not None and self.used_bytes > self.max_bytes
+        )
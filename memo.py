@@ -0,0 +1,81 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from lru import BoundedLRU
+from metrics import aggregate_over_time
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("GARMIN_STATS_MEMO_ENTRIES", 512))
+DEFAULT_MAX_BYTES = int(os.environ.get("GARMIN_STATS_MEMO_BUDGET", 32 * 1024 * 1024))
+
+
+def fingerprint(s: pd.Series) -> tuple[Hashable, ...]:
+    # One pass over the raw bytes of the index and the values, far cheaper
+    # than resampling them
+    index = np.ascontiguousarray(s.index.to_numpy().astype("datetime64[ns]"))
+    values = np.ascontiguousarray(s.to_numpy(dtype="float64", na_value=np.nan))
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(index.view("uint8"))
+    digest.update(values.view("uint8"))
+    bounds = (s.index.min(), s.index.max()) if len(s) else (None, None)
+    # The values are hashed as floats, so the dtype tells e.g. ints apart,
+    # and the name is kept by the aggregate
+    return (len(s), *bounds, str(s.dtype), s.name, digest.hexdigest())
+
+
+@dataclass(frozen=True)
+class MemoStats:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    used_bytes: int
+
+
+# A bounded LRU memo of aggregate_over_time, keyed by the fingerprint of the
+# series and the other arguments
+class AggregateMemo:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        aggregate: Callable[..., pd.Series] = aggregate_over_time,
+    ):
+        self._aggregate = aggregate
+        self._entries = BoundedLRU(max_bytes=max_bytes, max_entries=max_entries)
+
+    def aggregate(
+        self,
+        s: pd.Series,
+        freq: str,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+    ) -> pd.Series:
+        key = (fingerprint(s), freq, start, end)
+        out = self._entries.get(key)
+        if out is None:
+            # Computed without holding the lock, so other sessions aren't
+            # blocked
+            out = self._aggregate(s, freq, start, end)
+            out = self._entries.put(key, out, int(out.memory_usage(deep=True)))
+        return out.copy()
+
+    def stats(self) -> MemoStats:
+        return MemoStats(
+            self._entries.hits,
+            self._entries.misses,
+            self._entries.evictions,
+            len(self._entries),
+            self._entries.used_bytes,
+        )
+
+    @property
+    def used_bytes(self) -> int:
+        return self._entries.used_bytes
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -1,5 +1,7 @@
+from dataclasses import dataclass
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 SUMMABLE_COLUMNS = [
@@ -9,11 +11,11 @@ SUMMABLE_COLUMNS = [
     "Steg",
     "Kalorier",
     "Aerobisk Training Effect",
-    "Total stigning",
     "Totalt nedför",
     "Totalt antal årtag",
     "Totalt antal repetitioner",
     "Totalt antal set",
+    "Training Stress Score®",
 ]
 
 
@@ -28,6 +30,32 @@ def aggregate_over_time(
     if end is None:
         end = s.index.max()
 
+    out = s.resample(freq).sum().reindex(aggregation_range(start, end, freq)).fillna(0)
+
+    return out
+
+
+def extend_aggregate(aggregate: pd.Series, new: pd.Series, freq: str) -> pd.Series:
+    # Adds values of new activities, selected like the input of
+    # aggregate_over_time, to an aggregate made by it. Only the buckets of the
+    # new values are computed, the others are kept, and the range grows to
+    # cover both.
+    if len(new) == 0:
+        return aggregate
+    added = aggregate_over_time(new, freq)
+    if len(aggregate) == 0:
+        return added
+
+    combined = aggregate.add(added, fill_value=0)
+    # The labels are already the ends of the buckets, unlike the dates that
+    # aggregation_range anchors
+    buckets = pd.date_range(combined.index.min(), combined.index.max(), freq=freq)
+    return combined.reindex(buckets, fill_value=0).rename(aggregate.name)
+
+
+def aggregation_range(
+    start: pd.Timestamp, end: pd.Timestamp, freq: str
+) -> pd.DatetimeIndex:
     start = start.normalize()
     end = end.normalize()
 
@@ -40,9 +68,7 @@ def aggregate_over_time(
     elif freq == "YE":
         end += pd.offsets.YearEnd(0)
 
-    out = s.resample(freq).sum().reindex(pd.date_range(start, end, freq=freq)).fillna(0)
-
-    return out
+    return pd.date_range(start, end, freq=freq)
 
 
 def get_activities(df: pd.DataFrame) -> list[str]:
@@ -84,9 +110,52 @@ def col_exists_and_has_no_na(col_name: str, df: pd.DataFrame) -> bool:
 
 def col_has_non_zero_values(col_name: str, df: pd.DataFrame) -> bool:
     series = df[col_name]
-    return (series != 0).any()
+    return bool(non_zero(series).any())
 
 
 def select_metric_and_drop_zeros(df: pd.DataFrame, metric: str) -> pd.Series:
     s = df.loc[:, metric]
-    return s[s != 0]
+    return s[non_zero(s)]
+
+
+def non_zero(s: pd.Series) -> pd.Series:
+    # Arrow backed columns compare nulls to null instead of True like NaN, and
+    # can't be masked with that
+    mask = s != 0
+    if isinstance(mask.dtype, pd.ArrowDtype):
+        mask = mask.fillna(True).astype(bool)
+    return mask
+
+
+# Per activity type, whether each summable column has missing values and
+# whether it has non-zero values. Built in one grouped pass per dataset, so
+# that the valid metrics of any selection can be combined from the flags
+# without touching the rows.
+@dataclass(frozen=True)
+class MetricFlags:
+    has_na: pd.DataFrame
+    has_non_zero: pd.DataFrame
+
+
+def build_metric_flags(df: pd.DataFrame) -> MetricFlags:
+    cols = [col for col in SUMMABLE_COLUMNS if col in df.columns]
+    activity_types = np.asarray(df["Aktivitetstyp"], dtype=object)
+    values = df[cols]
+
+    has_na = values.isna().groupby(activity_types).any()
+    # Missing values count as non-zero, like in col_has_non_zero_values
+    has_non_zero = (values.ne(0) | values.isna()).groupby(activity_types).any()
+    return MetricFlags(has_na.astype(bool), has_non_zero.astype(bool))
+
+
+def get_summable_metrics_from_flags(
+    flags: MetricFlags, activities: list[str]
+) -> list[str]:
+    selected = [a for a in dict.fromkeys(activities) if a in flags.has_na.index]
+    if not selected:
+        return []
+
+    has_na = flags.has_na.loc[selected].any()
+    has_non_zero = flags.has_non_zero.loc[selected].any()
+    valid = ~has_na & has_non_zero
+    return [col for col in flags.has_na.columns if valid[col]]
@@ -0,0 +1,190 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from load_data import (
+    PARSER_VERSION,
+    CsvSource,
+    LazyActivityFrame,
+    load_data,
+    read_source_bytes,
+)
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get(
+        "GARMIN_STATS_CACHE_DIR",
+        Path.home() / ".cache" / "garmin-extended-stats",
+    )
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def content_key(data: bytes, parser_version: int = PARSER_VERSION) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    # The parser version is part of the file name, which lets stale entries
+    # be found without opening them
+    return f"v{parser_version}-{digest}"
+
+
+def cache_path(key: str, cache_dir: Path = DEFAULT_CACHE_DIR) -> Path:
+    return Path(cache_dir) / f"{key}.parquet"
+
+
+def load_data_cached(
+    source: CsvSource,
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+    columns: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    data = read_source_bytes(source)
+    path = cache_path(content_key(data), cache_dir)
+    if columns is not None:
+        # Like read_raw, the index and the activity type are always kept
+        columns = list(dict.fromkeys(["Aktivitetstyp", *columns]))
+
+    df = _read_entry(path, columns)
+    if df is not None:
+        return df
+
+    lazy = load_data(io.BytesIO(data), lazy=True)
+    if columns is None:
+        df = lazy.to_frame()
+        _store_entry(path, lazy, cache_dir, max_bytes)
+        return df
+
+    # Only the asked for columns are converted before returning. The entry
+    # needs all of them, so it is written in the background.
+    df = lazy[[name for name in lazy.columns if name in columns]]
+    thread = threading.Thread(
+        target=_store_entry, args=(path, lazy, cache_dir, max_bytes), daemon=True
+    )
+    thread.start()
+    with _writes_lock:
+        # Finished writers are dropped, so a long running server doesn't
+        # collect them
+        _pending_writes[:] = [t for t in _pending_writes if t.is_alive()]
+        _pending_writes.append(thread)
+    return df
+
+
+_pending_writes: list[threading.Thread] = []
+_writes_lock = threading.Lock()
+
+
+def wait_for_writes() -> None:
+    while True:
+        with _writes_lock:
+            if not _pending_writes:
+                return
+            thread = _pending_writes.pop()
+        thread.join()
+
+
+def _store_entry(
+    path: Path, lazy: LazyActivityFrame, cache_dir: Path, max_bytes: Optional[int]
+) -> None:
+    _write_entry(path, lazy.to_frame())
+    invalidate_stale(cache_dir)
+    if max_bytes is not None:
+        evict(cache_dir, max_bytes)
+
+
+def _read_entry(
+    path: Path, columns: Optional[list[str]] = None
+) -> Optional[pd.DataFrame]:
+    try:
+        if columns is not None:
+            names = pq.read_schema(path).names
+            # In the order of the file, like the parse that wrote it
+            columns = [name for name in names if name in columns]
+        df = pd.read_parquet(path, columns=columns)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # A truncated or otherwise unreadable entry is treated as a miss and
+        # gets overwritten by a fresh parse
+        return None
+
+    # The modification time doubles as the last access time for LRU eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return df
+
+
+def _write_entry(path: Path, df: pd.DataFrame) -> None:
+    # Write to a temporary file first so that concurrent readers never see a
+    # half written entry. Its name is unique, as two threads may write the
+    # same entry at once.
+    tmp_path = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f"{path.stem}.", suffix=".tmp", delete=False
+        ) as tmp:
+            tmp_path = Path(tmp.name)
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        # Like an unreadable entry, one that can't be written is only a miss
+        # the next time
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+def _entries(cache_dir: Path) -> list[Path]:
+    cache_dir = Path(cache_dir)
+    if not cache_dir.is_dir():
+        return []
+    return list(cache_dir.glob("*.parquet"))
+
+
+def evict(
+    cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES
+) -> int:
+    entries = []
+    for path in _entries(cache_dir):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    # Least recently used first
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def invalidate_stale(
+    cache_dir: Path = DEFAULT_CACHE_DIR, parser_version: int = PARSER_VERSION
+) -> int:
+    prefix = f"v{parser_version}-"
+    removed = 0
+    for path in _entries(cache_dir):
+        if not path.name.startswith(prefix):
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def clear_cache(cache_dir: Path = DEFAULT_CACHE_DIR) -> int:
+    removed = 0
+    for path in _entries(cache_dir):
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
@@ -1,9 +1,11 @@
-from typing import Optional
+from typing import Callable, Optional, Union
 
 import pandas as pd
 import streamlit as st
 
-from metrics import aggregate_over_time
+from cached import aggregate_over_time_cached
+from chart_data import MAX_POINTS, STRATEGY, chart_data
+from instrumentation import stage
 
 tab_info = [
     ("Day", "D", "%Y-%m-%d"),
@@ -17,17 +19,53 @@ def aggregation_bar_plot(
     s: pd.Series,
     start: Optional[pd.Timestamp] = None,
     end: Optional[pd.Timestamp] = None,
+    key: Optional[str] = None,
 ) -> None:
-    # Create tabs for different resolutions
-    tabs = st.tabs([label for label, _, _ in tab_info])
-    for tab, (_, freq, date_format) in zip(tabs, tab_info):
-        aggregated_s = aggregate_over_time(s, freq, start, end)
-        with tab:
-            plot_metric(aggregated_s, date_format)
+    resolution_bar_plot(
+        lambda freq: aggregate_over_time_cached(s, freq, start, end), key=key
+    )
 
 
-def plot_metric(data: pd.Series, fmt: str) -> None:
-    data = data.copy()
-    data.index = data.index.strftime(fmt)
+def resolution_bar_plot(
+    aggregate: Callable[[str], Union[pd.Series, pd.DataFrame]],
+    stack: Optional[bool] = None,
+    key: Optional[str] = None,
+) -> None:
+    # Unlike tabs, which all have to be drawn up front, only the selected
+    # resolution is aggregated and sent to the browser
+    labels = [label for label, _, _ in tab_info]
+    selected = st.segmented_control(
+        "Resolution",
+        labels,
+        default=labels[0],
+        required=True,
+        label_visibility="collapsed",
+        key=key,
+    )
+    _, freq, date_format = tab_info[labels.index(selected)]
+    with stage(f"aggregate[{freq}]"):
+        aggregated_s = aggregate(freq)
+    with stage(f"plot_metric[{freq}]"):
+        plot_metric(aggregated_s, date_format, stack)
+
+
+def plot_metric(
+    data: Union[pd.Series, pd.DataFrame],
+    fmt: str,
+    stack: Optional[bool] = None,
+    max_points: int = MAX_POINTS,
+    strategy: str = STRATEGY,
+) -> None:
+    chart = chart_data(data, fmt, max_points, strategy)
+    if len(chart) < len(data):
+        if strategy == "window":
+            st.caption(f"Showing the last {len(chart)} of {len(data)} periods.")
+        else:
+            st.caption(
+                f"{len(data)} periods shown as {len(chart)} bars, each labelled "
+                "with its first period."
+            )
 
-    st.bar_chart(data)
+    # Several columns, e.g. one per athlete, are placed side by side with
+    # stack=False
+    st.bar_chart(chart, stack=stack)
@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from days import day_numbers, day_positions, day_range
+
+
+# One bitmap per activity type with a bit set for every day, from the first to
+# the last day of the dataset, on which that type was done. Rest days for any
+# set of ignored activities are found by OR-ing the bitmaps of the others.
+@dataclass(frozen=True)
+class RestDayEngine:
+    days: pd.DatetimeIndex
+    masks: dict[str, np.ndarray]
+
+
+@dataclass(frozen=True)
+class Streak:
+    start: pd.Timestamp
+    length: int
+
+
+def build_rest_day_engine(df: pd.DataFrame) -> RestDayEngine:
+    if len(df) == 0:
+        return RestDayEngine(pd.DatetimeIndex([], freq="D"), {})
+
+    positions, days = day_positions(df.index)
+
+    codes, activities = pd.factorize(np.asarray(df["Aktivitetstyp"], dtype=object))
+    masks = {}
+    for code, activity in enumerate(activities):
+        mask = np.zeros(len(days), dtype=bool)
+        mask[positions[codes == code]] = True
+        masks[activity] = np.packbits(mask)
+    return RestDayEngine(days, masks)
+
+
+def extend_rest_day_engine(engine: RestDayEngine, df: pd.DataFrame) -> RestDayEngine:
+    # Adds the days of new activities to an engine. Their bits are set
+    # directly in copies of the packed bitmaps, so apart from the copy the
+    # cost only depends on the new rows.
+    if len(df) == 0:
+        return engine
+    if len(engine.days) == 0:
+        return build_rest_day_engine(df)
+
+    numbers = day_numbers(df.index)
+    old_first = day_numbers(engine.days[:1])[0]
+    first_day = min(numbers.min(), old_first)
+    n_days = int(max(numbers.max(), old_first + len(engine.days) - 1) - first_day + 1)
+
+    shift = int(old_first - first_day)
+    masks = {
+        activity: _resize(mask, len(engine.days), shift, n_days)
+        for activity, mask in engine.masks.items()
+    }
+    codes, activities = pd.factorize(np.asarray(df["Aktivitetstyp"], dtype=object))
+    for code, activity in enumerate(activities):
+        if activity not in masks:
+            masks[activity] = np.zeros((n_days + 7) // 8, dtype=np.uint8)
+        positions = numbers[codes == code] - first_day
+        # packbits puts the first day in the highest bit of each byte
+        bits = (0x80 >> (positions & 7)).astype(np.uint8)
+        np.bitwise_or.at(masks[activity], positions >> 3, bits)
+    return RestDayEngine(day_range(first_day, n_days), masks)
+
+
+def _resize(packed: np.ndarray, count: int, shift: int, n_days: int) -> np.ndarray:
+    # A copy of a bitmap of count days moved shift days later in a bitmap of
+    # n_days days
+    if shift == 0:
+        out = np.zeros((n_days + 7) // 8, dtype=np.uint8)
+        out[: len(packed)] = packed
+        return out
+    mask = np.zeros(n_days, dtype=bool)
+    mask[shift : shift + count] = np.unpackbits(packed, count=count)
+    return np.packbits(mask)
+
+
+def active_day_mask(engine: RestDayEngine, ignored: list[str]) -> np.ndarray:
+    ignored_set = set(ignored)
+    packed = np.zeros((len(engine.days) + 7) // 8, dtype=np.uint8)
+    for activity, mask in engine.masks.items():
+        if activity not in ignored_set:
+            packed |= mask
+    return np.unpackbits(packed, count=len(engine.days)).astype(bool)
+
+
+def get_rest_days(engine: RestDayEngine, ignored: list[str]) -> pd.Series:
+    rest = ~active_day_mask(engine, ignored)
+    return pd.Series(1, index=engine.days[rest])
+
+
+def _runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Start positions and lengths of the runs of True in mask
+    padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends - starts
+
+
+def _longest(engine: RestDayEngine, mask: np.ndarray) -> Streak:
+    starts, lengths = _runs(mask)
+    if len(lengths) == 0:
+        return Streak(pd.NaT, 0)
+    # argmax picks the earliest of equally long streaks
+    i = int(np.argmax(lengths))
+    return Streak(engine.days[starts[i]], int(lengths[i]))
+
+
+def longest_rest_streak(engine: RestDayEngine, ignored: list[str]) -> Streak:
+    return _longest(engine, ~active_day_mask(engine, ignored))
+
+
+def longest_training_streak(engine: RestDayEngine, ignored: list[str]) -> Streak:
+    return _longest(engine, active_day_mask(engine, ignored))
+
+
+def monthly_streak_histogram(
+    engine: RestDayEngine, ignored: list[str], rest: bool = True
+) -> pd.DataFrame:
+    # Number of rest (or training) streaks of each length, by the month the
+    # streak started in
+    mask = active_day_mask(engine, ignored)
+    if rest:
+        mask = ~mask
+    starts, lengths = _runs(mask)
+
+    months = engine.days[starts].to_period("M").to_timestamp()
+    histogram = (
+        pd.Series(1, index=pd.MultiIndex.from_arrays([months, lengths]))
+        .groupby(level=[0, 1])
+        .sum()
+        .unstack(fill_value=0)
+    )
+    histogram.index.name = "Month"
+    histogram.columns.name = "Streak length"
+    return histogram
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from cube import DailyCube, daily_sums
+
+WINDOWS = [7, 28, 42]
+ACUTE_WINDOW = 7
+CHRONIC_WINDOW = 28
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    # Every window is the difference of two cumulative sums, so all windows
+    # together cost one pass over the days. Days before the first one count
+    # as zero.
+    cumulative = np.cumsum(values, dtype="float64")
+    out = cumulative.copy()
+    out[window:] -= cumulative[:-window]
+    return out
+
+
+def rolling_load(daily: pd.Series, windows: list[int] = WINDOWS) -> pd.DataFrame:
+    # daily must have a value for every day, like the series from daily_load
+    values = daily.to_numpy(dtype="float64", na_value=np.nan)
+    values = np.nan_to_num(values)
+
+    columns = {}
+    for window in windows:
+        sums = rolling_sum(values, window)
+        columns[f"{window}-day sum"] = sums
+        columns[f"{window}-day mean"] = sums / window
+    columns["ACWR"] = acute_chronic_ratio(values)
+    return pd.DataFrame(columns, index=daily.index)
+
+
+def acute_chronic_ratio(values: np.ndarray) -> np.ndarray:
+    acute = rolling_sum(values, ACUTE_WINDOW) / ACUTE_WINDOW
+    chronic = rolling_sum(values, CHRONIC_WINDOW) / CHRONIC_WINDOW
+    ratio = np.full(len(values), np.nan)
+    # Undefined until a whole chronic window has passed, and without load
+    valid = chronic > 0
+    valid[: CHRONIC_WINDOW - 1] = False
+    ratio[valid] = acute[valid] / chronic[valid]
+    return ratio
+
+
+def daily_load(cube: DailyCube, activities: list[str], metric: str) -> pd.Series:
+    return pd.Series(daily_sums(cube, activities, metric), index=cube.days, name=metric)
@@ -0,0 +1,245 @@
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+Parser = Callable[[pd.Series], pd.Series]
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    # dtype read_csv is told to use for the raw column
+    read_dtype: str
+    parser: Optional[Parser] = None
+    unit: Optional[str] = None
+    # Smaller dtype used by compact.compact_frame, None keeps the parsed dtype
+    compact_dtype: Optional[str] = None
+    # Type of the column with load_data(..., dtype_backend="pyarrow")
+    arrow_type: Optional[pa.DataType] = None
+
+    def parse(self, s: pd.Series) -> pd.Series:
+        if self.parser is None:
+            return s
+        return self.parser(s)
+
+    def to_arrow(self, s: pd.Series) -> pd.Series:
+        if self.arrow_type is None or isinstance(s.dtype, pd.ArrowDtype):
+            return s
+        return to_arrow_column(s, self.arrow_type)
+
+
+def _arrow_strings(s: pd.Series) -> Union[pa.Array, pa.ChunkedArray]:
+    # Works for object columns from the C engine as well as the Arrow backed
+    # string columns from the pyarrow engine
+    if isinstance(s.dtype, pd.ArrowDtype):
+        return pa.chunked_array(pa.array(s.array)).cast(pa.string())
+    return pa.array(s.to_numpy(dtype=object, na_value=None), type=pa.string())
+
+
+def _from_arrow(values: pa.Array, s: pd.Series) -> pd.Series:
+    return pd.Series(values.to_numpy(zero_copy_only=False), index=s.index, name=s.name)
+
+
+def parse_text(s: pd.Series) -> pd.Series:
+    # Missing values become "nan", like astype(str) would make them
+    values = pc.utf8_trim_whitespace(_arrow_strings(s)).fill_null("nan")
+    return _from_arrow(values, s)
+
+
+def parse_number(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype("float64")
+    # The pyarrow engine can't strip thousands separators while reading
+    values = pc.replace_substring(_arrow_strings(s), ",", "")
+    try:
+        values = pc.cast(values, pa.float64())
+    except pa.ArrowInvalid:
+        return pd.to_numeric(_from_arrow(values, s), errors="coerce").astype("float64")
+    return _from_arrow(values, s).astype("float64")
+
+
+def parse_datetime(s: pd.Series) -> pd.Series:
+    return pd.to_datetime(s, errors="coerce", format="ISO8601")
+
+
+def boolean_parser(values: dict[str, bool]) -> Parser:
+    def parse(s: pd.Series) -> pd.Series:
+        words = pc.utf8_lower(pc.utf8_trim_whitespace(_arrow_strings(s)))
+        words = _from_arrow(words, s)
+        return words.map(values)
+
+    return parse
+
+
+def _clock_to_seconds(s: pd.Series, n_parts: int) -> np.ndarray:
+    # Splits "h:m:s" like strings with Arrow kernels and weighs the parts with
+    # powers of 60, instead of parsing every string with to_timedelta
+    parts = pc.split_pattern(_arrow_strings(s), ":")
+    counts = pc.list_value_length(parts).fill_null(0).to_numpy()
+    values = pc.cast(pc.list_flatten(parts), pa.float64()).to_numpy(
+        zero_copy_only=False
+    )
+
+    owner = np.repeat(np.arange(len(counts)), counts)
+    position = np.arange(len(values)) - (np.cumsum(counts) - counts)[owner]
+    weights = 60.0 ** (counts[owner] - 1 - position)
+    seconds = np.bincount(owner, values * weights, minlength=len(counts))
+    seconds = seconds.astype("float64")
+    # Anything that isn't exactly n_parts long is rejected, like to_timedelta
+    # does for e.g. "6:14"
+    seconds[counts != n_parts] = np.nan
+    return seconds
+
+
+def _clock_seconds_parser(n_parts: int) -> Callable[[pd.Series], np.ndarray]:
+    def parse(s: pd.Series) -> np.ndarray:
+        try:
+            return _clock_to_seconds(s, n_parts)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Unparsable parts, fall back to the slow but forgiving parser
+            if n_parts == 2:
+                s = "00:" + s.astype(object)
+            return pd.to_timedelta(s, errors="coerce").dt.total_seconds().to_numpy()
+
+    return parse
+
+
+def _seconds_to_timedelta(seconds: np.ndarray, s: pd.Series) -> pd.Series:
+    missing = np.isnan(seconds)
+    nanoseconds = np.round(np.where(missing, 0, seconds) * 1e9).astype("int64")
+    nanoseconds[missing] = np.iinfo("int64").min  # NaT
+    return pd.Series(nanoseconds.view("m8[ns]"), index=s.index, name=s.name)
+
+
+def clock_parser(n_parts: int) -> Parser:
+    to_seconds = _clock_seconds_parser(n_parts)
+
+    def parse(s: pd.Series) -> pd.Series:
+        return _seconds_to_timedelta(to_seconds(s), s)
+
+    return parse
+
+
+def hours_parser(s: pd.Series) -> pd.Series:
+    return pd.Series(_clock_seconds_parser(3)(s) / 3600, index=s.index, name=s.name)
+
+
+parse_duration = clock_parser(3)
+DURATION = pa.duration("ms")
+# Paces are written as "min:sec"
+parse_pace = clock_parser(2)
+
+
+def to_arrow_column(s: pd.Series, arrow_type: pa.DataType) -> pd.Series:
+    if pa.types.is_duration(arrow_type):
+        if not pd.api.types.is_timedelta64_dtype(s):
+            # Hours
+            hours = s.to_numpy(dtype="float64", na_value=np.nan)
+            s = pd.Series(pd.to_timedelta(hours, unit="h"), index=s.index)
+        values = pa.array(s.dt.round(f"1{arrow_type.unit}"), from_pandas=True)
+        values = values.cast(arrow_type)
+    elif pa.types.is_string(arrow_type) or pa.types.is_dictionary(arrow_type):
+        strings = s.to_numpy(dtype=object)
+        # parse_text writes missing values as "nan"
+        missing = pd.isna(strings) | (strings == "nan")
+        values = pa.array(strings, type=pa.string(), mask=missing)
+        if pa.types.is_dictionary(arrow_type):
+            values = values.dictionary_encode().cast(arrow_type)
+    else:
+        values = pa.array(s.to_numpy(), type=arrow_type, from_pandas=True)
+    return pd.Series(pd.arrays.ArrowExtensionArray(values), index=s.index, name=s.name)
+
+
+def text(unit: Optional[str] = None) -> ColumnSpec:
+    return ColumnSpec("object", parse_text, unit, arrow_type=pa.string())
+
+
+def number(unit: Optional[str] = None) -> ColumnSpec:
+    return ColumnSpec("float64", parse_number, unit, "float32", pa.float64())
+
+
+def counter(unit: Optional[str] = None) -> ColumnSpec:
+    return ColumnSpec("float64", parse_number, unit, "Int32", pa.float64())
+
+
+def duration() -> ColumnSpec:
+    return ColumnSpec("object", parse_duration, arrow_type=DURATION)
+
+
+def pace(unit: Optional[str] = None) -> ColumnSpec:
+    return ColumnSpec("object", parse_pace, unit, arrow_type=DURATION)
+
+
+def hours() -> ColumnSpec:
+    # Hours as floats, durations with the pyarrow backend
+    return ColumnSpec("object", hours_parser, "h", "float32", DURATION)
+
+
+COLUMNS: dict[str, ColumnSpec] = {
+    "Aktivitetstyp": ColumnSpec(
+        "object",
+        parse_text,
+        compact_dtype="category",
+        arrow_type=pa.dictionary(pa.int32(), pa.string()),
+    ),
+    "Datum": ColumnSpec("object", parse_datetime),
+    "Favorit": ColumnSpec(
+        "object",
+        boolean_parser({"true": True, "false": False}),
+        arrow_type=pa.bool_(),
+    ),
+    "Namn": text(),
+    "Distans": number("km"),
+    "Kalorier": counter("kcal"),
+    "Tid": hours(),
+    "Medelpuls": number("bpm"),
+    "Maxpuls": number("bpm"),
+    "Aerobisk Training Effect": number(),
+    "Medellöpkadens": number("spm"),
+    "Maximal löpkadens": number("spm"),
+    "Medeltempo": pace("min/km"),
+    "Bästa tempo": pace("min/km"),
+    "Total stigning": number("m"),
+    "Totalt nedför": number("m"),
+    "Medelsteglängd": number("m"),
+    "Medelvärde för vertikal kvot": number("%"),
+    "Medelvärde för vertikal rörelse": number("cm"),
+    "Medeltid för markkontakt": number("ms"),
+    "Medelkontakttidsbalans": text(),
+    "Medelvärde GAP": pace("min/km"),
+    "Normalized Power® (NP®)": number("W"),
+    "Training Stress Score®": number(),
+    "Med. kraft": number("W"),
+    "Maxkraft": number("W"),
+    "Totalt antal årtag": counter(),
+    "Medel-Swolf": number(),
+    "Medelårtagstempo": number(),
+    "Steg": counter(),
+    "Totalt antal repetitioner": counter(),
+    "Totalt antal set": counter(),
+    "Urladdning av Body Battery": number(),
+    "Minsta temperatur": number("°C"),
+    "Dekompression": ColumnSpec(
+        "object",
+        boolean_parser({"ja": True, "nej": False}),
+        arrow_type=pa.bool_(),
+    ),
+    "Bästa varvtid": duration(),
+    "Antal varv": counter(),
+    "Maximal temperatur": number("°C"),
+    "Genomsnittlig andning": number("brpm"),
+    "Minsta andningshastighet": number("brpm"),
+    "Maximal andningshastighet": number("brpm"),
+    "Stressändring": number(),
+    "Start för stress": duration(),
+    "Slut för stress": duration(),
+    "Medestress": number(),
+    "Maxbelastning": number(),
+    "Färdtid": hours(),
+    "Total tid": hours(),
+    "Min. höjd": number("m"),
+    "Max. höjd": number("m"),
+}
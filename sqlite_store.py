@@ -0,0 +1,249 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from load_data import CsvSource, activity_keys, load_data
+from metrics import SUMMABLE_COLUMNS, aggregate_over_time
+from parquet_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_DB_PATH = Path(
+    os.environ.get("GARMIN_STATS_DB", DEFAULT_CACHE_DIR / "activities.sqlite")
+)
+
+# The summable columns are all that the queries below need, Tid in hours like
+# the frames from load_data
+_METRICS = ", ".join(f'"{col}" REAL' for col in SUMMABLE_COLUMNS)
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS activities (
+    dataset TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    occurrence INTEGER NOT NULL,
+    Datum TEXT NOT NULL,
+    Aktivitetstyp TEXT NOT NULL,
+    {_METRICS},
+    UNIQUE (dataset, key, occurrence)
+);
+CREATE INDEX IF NOT EXISTS activities_type_datum
+    ON activities (dataset, Aktivitetstyp, Datum);
+"""
+
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def connect(
+    path: Union[str, Path] = DEFAULT_DB_PATH, check_same_thread: bool = True
+) -> sqlite3.Connection:
+    if str(path) != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def store_activities(conn: sqlite3.Connection, dataset: str, df: pd.DataFrame) -> int:
+    # Rows are stored under the key of the dataset they belong to, e.g. the
+    # content key of its exports, which the queries below are scoped to.
+    # Activities already in the dataset, e.g. from an earlier export of the
+    # same history, are skipped by their activity key. Rows that repeat
+    # within one export are kept like load_data keeps them, they are told
+    # apart by how many times the key came before.
+    keys = activity_keys(df)
+    occurrence = keys.groupby(keys.to_numpy()).cumcount().to_numpy()
+    keys = keys.to_numpy().view("int64")
+    columns = {
+        col: df[col].to_numpy(dtype="float64", na_value=np.nan)
+        for col in SUMMABLE_COLUMNS
+        if col in df.columns
+    }
+    metrics = [
+        (
+            [None if np.isnan(value) else float(value) for value in columns[col]]
+            if col in columns
+            else [None] * len(df)
+        )
+        for col in SUMMABLE_COLUMNS
+    ]
+    rows = zip(
+        [dataset] * len(df),
+        keys.tolist(),
+        occurrence.tolist(),
+        df.index.strftime(_DATE_FORMAT),
+        np.asarray(df["Aktivitetstyp"], dtype=object),
+        *metrics,
+    )
+
+    placeholders = ", ".join(["?"] * (5 + len(SUMMABLE_COLUMNS)))
+    before = conn.total_changes
+    with conn:
+        conn.executemany(
+            f"INSERT OR IGNORE INTO activities VALUES ({placeholders})", rows
+        )
+    return conn.total_changes - before
+
+
+def import_exports(
+    conn: sqlite3.Connection,
+    dataset: str,
+    csv_path: Union[CsvSource, list[CsvSource]],
+) -> int:
+    df = load_data(csv_path, columns=SUMMABLE_COLUMNS)
+    return store_activities(conn, dataset, df)
+
+
+def get_activities(conn: sqlite3.Connection, dataset: str) -> list[str]:
+    # In the order they first appear in the newest first exports, like
+    # metrics.get_activities
+    rows = conn.execute(
+        "SELECT Aktivitetstyp FROM activities WHERE dataset = ?"
+        " GROUP BY Aktivitetstyp ORDER BY MAX(Datum) DESC",
+        (dataset,),
+    )
+    return [activity for (activity,) in rows]
+
+
+def _in_activities(activities: list[str]) -> str:
+    return f"Aktivitetstyp IN ({', '.join(['?'] * len(activities))})"
+
+
+def filter_activities(
+    conn: sqlite3.Connection, dataset: str, activities: list[str]
+) -> pd.DataFrame:
+    columns = ", ".join(f'"{col}"' for col in SUMMABLE_COLUMNS)
+    df = pd.read_sql_query(
+        f"SELECT Datum, Aktivitetstyp, {columns} FROM activities"
+        f" WHERE dataset = ? AND {_in_activities(activities)}"
+        " ORDER BY Datum DESC",
+        conn,
+        params=[dataset, *activities],
+        parse_dates={"Datum": _DATE_FORMAT},
+        index_col="Datum",
+    )
+    return df.astype({col: "float64" for col in SUMMABLE_COLUMNS})
+
+
+def get_summable_metrics(
+    conn: sqlite3.Connection, dataset: str, activities: list[str]
+) -> list[str]:
+    # Like metrics.get_summable_metrics on the selected activities: no
+    # missing values and at least one non-zero one
+    counts = ", ".join(
+        f'SUM("{col}" IS NULL), SUM("{col}" != 0)' for col in SUMMABLE_COLUMNS
+    )
+    row = conn.execute(
+        f"SELECT COUNT(*), {counts} FROM activities"
+        f" WHERE dataset = ? AND {_in_activities(activities)}",
+        [dataset, *activities],
+    ).fetchone()
+    if row[0] == 0:
+        return []
+    return [
+        col
+        for i, col in enumerate(SUMMABLE_COLUMNS)
+        if row[1 + 2 * i] == 0 and row[2 + 2 * i] > 0
+    ]
+
+
+def daily_sums(
+    conn: sqlite3.Connection, dataset: str, activities: list[str], metric: str
+) -> pd.Series:
+    # One row per day instead of one per activity. Zeros are left out like in
+    # select_metric_and_drop_zeros, so the first and last day are the same.
+    if metric not in SUMMABLE_COLUMNS:
+        raise ValueError(f"{metric} is not a summable metric")
+    rows = conn.execute(
+        f'SELECT date(Datum), SUM("{metric}") FROM activities'
+        f" WHERE dataset = ? AND {_in_activities(activities)}"
+        f' AND "{metric}" IS NOT 0'
+        " GROUP BY date(Datum) ORDER BY date(Datum)",
+        [dataset, *activities],
+    ).fetchall()
+    days = pd.DatetimeIndex([day for day, _ in rows], name="Datum")
+    sums = np.array([np.nan if s is None else s for _, s in rows], dtype="float64")
+    return pd.Series(sums, index=days, name=metric)
+
+
+def aggregate(
+    conn: sqlite3.Connection,
+    dataset: str,
+    activities: list[str],
+    metric: str,
+    freq: str,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+) -> pd.Series:
+    sums = daily_sums(conn, dataset, activities, metric)
+    if len(sums) == 0 and (start is None or end is None):
+        return pd.Series([], index=pd.DatetimeIndex([]), dtype="float64", name=metric)
+    return aggregate_over_time(sums, freq, start, end)
+
+
+def compare_aggregate(
+    conn: sqlite3.Connection,
+    datasets: dict[str, str],
+    activities: list[str],
+    metric: str,
+    freq: str,
+) -> pd.DataFrame:
+    # Like cube.compare_rollup, one column per name in datasets over one
+    # period that covers the days of all of them
+    sums = {
+        name: daily_sums(conn, dataset, activities, metric)
+        for name, dataset in datasets.items()
+    }
+    days = [s.index for s in sums.values() if len(s) > 0]
+    if not days:
+        return pd.DataFrame(
+            index=pd.DatetimeIndex([]), columns=list(datasets), dtype="float64"
+        )
+
+    start = min(index.min() for index in days)
+    end = max(index.max() for index in days)
+    return pd.DataFrame(
+        {name: aggregate_over_time(s, freq, start, end) for name, s in sums.items()}
+    )
+
+
+# One connection shared by the dashboard's sessions, which run in their own
+# threads. Every dataset the dashboard loads is imported once under its key,
+# so sessions that upload the same exports share the rows, and no session
+# sees the rows of another's exports.
+class ActivityDatabase:
+    def __init__(self, path: Union[str, Path] = DEFAULT_DB_PATH):
+        self._conn = connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._imported: set[str] = set()
+
+    def import_dataset(self, dataset: str, df: pd.DataFrame) -> None:
+        with self._lock:
+            if dataset not in self._imported:
+                store_activities(self._conn, dataset, df)
+                self._imported.add(dataset)
+
+    def get_activities(self, dataset: str) -> list[str]:
+        with self._lock:
+            return get_activities(self._conn, dataset)
+
+    def get_summable_metrics(self, dataset: str, activities: list[str]) -> list[str]:
+        with self._lock:
+            return get_summable_metrics(self._conn, dataset, activities)
+
+    def aggregate(
+        self, dataset: str, activities: list[str], metric: str, freq: str
+    ) -> pd.Series:
+        with self._lock:
+            return aggregate(self._conn, dataset, activities, metric, freq)
+
+    def compare_aggregate(
+        self, datasets: dict[str, str], activities: list[str], metric: str, freq: str
+    ) -> pd.DataFrame:
+        with self._lock:
+            return compare_aggregate(self._conn, datasets, activities, metric, freq)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from load_data import CsvSource, convert, read_raw_chunks
+from metrics import SUMMABLE_COLUMNS, MetricFlags, build_metric_flags
+
+
+# One row per day and activity type with the daily sums of the summable
+# metrics, indexed by the day like the frames from load_data. It can be passed
+# to build_daily_cube, build_rest_day_engine, get_days_without_activity and,
+# through select_metric_and_drop_zeros, aggregate_over_time, which give the
+# same results as for the full frame. Missing values are lost in the sums, so
+# the metric flags are kept next to it.
+@dataclass(frozen=True)
+class DailyAggregates:
+    df: pd.DataFrame
+    flags: MetricFlags
+    # Number of activities folded into the sums
+    activities: int
+
+
+def load_daily_aggregates(
+    csv_path: CsvSource,
+    chunk_rows: int = 100_000,
+    metrics: Optional[list[str]] = None,
+) -> DailyAggregates:
+    # Only one chunk of raw rows is held at a time, next to the aggregates
+    # which grow with the number of days, not the number of activities
+    if metrics is None:
+        metrics = SUMMABLE_COLUMNS
+    metrics = list(dict.fromkeys(metrics))
+
+    daily = None
+    activities = 0
+    has_na = None
+    has_non_zero = None
+    for raw in read_raw_chunks(csv_path, metrics, chunk_rows):
+        chunk = convert(raw)
+        activities += len(chunk)
+        chunk_daily = daily_sums_frame(chunk)
+        flags = build_metric_flags(chunk)
+
+        if daily is None:
+            daily, has_na, has_non_zero = chunk_daily, flags.has_na, flags.has_non_zero
+            continue
+        daily = _fold(daily, chunk_daily, "sum")
+        has_na = _fold(has_na, flags.has_na, "any")
+        has_non_zero = _fold(has_non_zero, flags.has_non_zero, "any")
+
+    if daily is None:
+        return DailyAggregates(
+            pd.DataFrame(
+                columns=["Aktivitetstyp", *metrics],
+                index=pd.DatetimeIndex([], name="Datum"),
+            ),
+            build_metric_flags(pd.DataFrame(columns=["Aktivitetstyp", *metrics])),
+            0,
+        )
+
+    daily = daily.reset_index(level="Aktivitetstyp").sort_index(kind="stable")
+    return DailyAggregates(daily, MetricFlags(has_na, has_non_zero), activities)
+
+
+def daily_sums_frame(df: pd.DataFrame) -> pd.DataFrame:
+    metrics = [col for col in df.columns if col in SUMMABLE_COLUMNS]
+    keys = [
+        pd.Index(df.index.normalize(), name="Datum"),
+        pd.Index(np.asarray(df["Aktivitetstyp"], dtype=object), name="Aktivitetstyp"),
+    ]
+    # NaN is skipped like resample().sum() does
+    return df[metrics].astype("float64").groupby(keys, sort=False).sum()
+
+
+def _fold(total: pd.DataFrame, chunk: pd.DataFrame, how: str) -> pd.DataFrame:
+    combined = pd.concat([total, chunk])
+    levels = list(range(combined.index.nlevels))
+    return getattr(combined.groupby(level=levels, sort=False), how)()
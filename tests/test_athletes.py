@@ -0,0 +1,347 @@
+import io
+import threading
+import zipfile
+from concurrent.futures import wait
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from athletes import (
+    AthleteStore,
+    athlete_name,
+    frame_bytes,
+    load_compact,
+    object_bytes,
+    unpack_uploads,
+)
+from compact import compact_frame
+from cube import build_daily_cube, extend_cube
+from load_data import load_data
+from parquet_cache import load_data_cached
+from rest_days import RestDayEngine
+
+TEST_FILE = Path("tests/testfiles/activities.csv")
+
+
+@pytest.mark.parametrize(
+    "file_name, expected",
+    [
+        ("Activities-26-02-08.csv", "Me"),
+        ("Staffan-Activities-26-02-11.csv", "Staffan"),
+        ("csv_files/Anna-Maria-Activities-25-01-01.csv", "Anna-Maria"),
+        ("notes.csv", None),
+    ],
+)
+def test_athlete_name(file_name, expected):
+    assert athlete_name(file_name, "Me") == expected
+
+
+def frame(rows):
+    return pd.DataFrame(
+        {"Aktivitetstyp": ["Löpning"] * rows, "Tid": 1.0, "Distans": 1.0},
+        index=pd.date_range("2024-01-01", periods=rows, freq="D"),
+    )
+
+
+def fake_loader(calls):
+    def load(sources):
+        calls.append(sources[0])
+        return frame(int(sources[0]))
+
+    return load
+
+
+def test_store_only_parses_on_first_get():
+    calls = []
+    store = AthleteStore(load=fake_loader(calls))
+
+    first = store.get("Anna", [b"10"])
+    second = store.get("Anna", [b"10"])
+
+    assert calls == [b"10"]
+    assert first.df is second.df
+    assert first.athlete == "Anna"
+
+
+def test_store_evicts_least_recently_displayed():
+    calls = []
+    size = frame_bytes(frame(100))
+    store = AthleteStore(max_bytes=2 * size, load=fake_loader(calls))
+
+    store.get("Anna", [b"100"])
+    store.get("Bo", [b"100 "])
+    # Anna is displayed again, so Bo is the least recently displayed
+    store.get("Anna", [b"100"])
+    store.get("Cecilia", [b"100  "])
+
+    assert store.used_bytes <= store.max_bytes
+    store.get("Anna", [b"100"])
+    assert calls == [b"100", b"100 ", b"100  "]
+    store.get("Bo", [b"100 "])
+    assert calls[-1] == b"100 "
+
+
+def test_store_keeps_frame_over_budget():
+    store = AthleteStore(max_bytes=1, load=fake_loader([]))
+
+    dataset = store.get("Anna", [b"100"])
+
+    assert store.used_bytes == frame_bytes(dataset.df)
+
+
+def test_derived_structures_are_kept_with_the_frame():
+    calls = []
+    store = AthleteStore(load=fake_loader([]))
+    dataset = store.get("Anna", [b"100"])
+
+    def build(df):
+        calls.append(len(df))
+        return df["Distans"].to_numpy() * 2
+
+    first = store.derived(dataset, "doubled", build)
+    second = store.derived(dataset, "doubled", build)
+
+    assert calls == [100]
+    assert first is second
+    assert store.used_bytes == frame_bytes(dataset.df) + first.nbytes
+
+
+def test_derived_structures_are_evicted_with_the_frame():
+    size = frame_bytes(frame(100))
+    store = AthleteStore(max_bytes=3 * size, load=fake_loader([]))
+    anna = store.get("Anna", [b"100"])
+    store.get("Bo", [b"100 "])
+
+    # Anna's derived structure pushes the store over the budget, and Bo is
+    # the least recently used
+    store.derived(anna, "copy", lambda df: df.copy())
+    store.derived(anna, "another copy", lambda df: df.copy())
+
+    assert store.used_bytes == 3 * size
+    assert store.derived(anna, "copy", lambda df: None) is not None
+
+
+def test_object_bytes():
+    index = pd.date_range("2024-01-01", periods=10, freq="D")
+    engine = RestDayEngine(index, {"Löpning": np.zeros(10, dtype=bool)})
+
+    assert object_bytes(engine) == (
+        index.memory_usage(deep=True) + object_bytes("Löpning") + 10
+    )
+
+
+def test_load_compact_merges_exports(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "athletes.load_data_cached", partial(load_data_cached, cache_dir=tmp_path)
+    )
+    data = TEST_FILE.read_bytes()
+
+    df = load_compact([data, data])
+
+    assert len(df) == len(load_compact([data]))
+    assert str(df["Aktivitetstyp"].dtype) == "category"
+
+
+def split_export():
+    # Two overlapping exports of the test history
+    header, *lines = TEST_FILE.read_bytes().splitlines(keepends=True)
+    return header + b"".join(lines[:700]), header + b"".join(lines[400:])
+
+
+def test_load_compact_matches_load_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "athletes.load_data_cached", partial(load_data_cached, cache_dir=tmp_path)
+    )
+    first, second = split_export()
+
+    df = load_compact([first, second])
+
+    expected = compact_frame(load_data([first, second]), prune=True)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def named(data, name):
+    source = io.BytesIO(data)
+    source.name = name
+    return source
+
+
+def test_unpack_uploads():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("exports/Anna-Activities-26-01-01.csv", b"a")
+        zf.writestr("exports/notes.txt", b"b")
+        zf.writestr("Activities-26-02-01.csv", b"c")
+
+    sources = unpack_uploads(
+        [named(archive.getvalue(), "season.zip"), named(b"d", "Activities.csv")]
+    )
+
+    assert [s.name for s in sources] == [
+        "Anna-Activities-26-01-01.csv",
+        "Activities-26-02-01.csv",
+        "Activities.csv",
+    ]
+    assert [s.read() for s in sources] == [b"a", b"c", b"d"]
+
+
+def released_parse(released):
+    # Each export is parsed once its event is set
+    def parse(source):
+        assert released[source].wait(5)
+        return frame(int(source))
+
+    return parse
+
+
+def wait_for_parse(store, source):
+    # The background parse of source, which is dropped once it is stored
+    (key,) = store.source_keys([source])
+    future = store._parses.get(key)
+    if future is not None:
+        wait([future], timeout=5)
+
+
+def test_get_available_gives_partial_datasets():
+    released = {b"10": threading.Event(), b"20": threading.Event()}
+    store = AthleteStore(parse=released_parse(released), workers=2)
+    sources = [b"10", b"20"]
+
+    assert store.get_available("Anna", sources) == (None, 0)
+
+    released[b"20"].set()
+    wait_for_parse(store, b"20")
+    assert store.parsed_count(sources) == 1
+    partial_dataset, parsed = store.get_available("Anna", sources)
+    assert parsed == 1
+    assert len(partial_dataset.df) == 20
+    assert not partial_dataset.complete
+
+    released[b"10"].set()
+    wait_for_parse(store, b"10")
+    assert store.parsed_count(sources) == 2
+    dataset, parsed = store.get_available("Anna", sources)
+    assert parsed == 2
+    assert dataset.complete
+    # The second export repeats the ten days of the first
+    assert len(dataset.df) == 20
+    assert dataset.key != partial_dataset.key
+    assert store.get_available("Anna", sources)[0].df is dataset.df
+
+
+def test_growing_dataset_extends_derived_structures():
+    released = {b"10": threading.Event(), b"20": threading.Event()}
+    extended = []
+
+    def extend_cube_counting(cube, new):
+        extended.append(len(new))
+        return extend_cube(cube, new)
+
+    store = AthleteStore(
+        parse=released_parse(released),
+        workers=2,
+        extenders={"daily_cube": extend_cube_counting},
+    )
+    sources = [b"10", b"20"]
+    store.get_available("Anna", sources)
+
+    released[b"10"].set()
+    wait_for_parse(store, b"10")
+    partial_dataset, _ = store.get_available("Anna", sources)
+    store.derived(partial_dataset, "daily_cube", build_daily_cube)
+
+    released[b"20"].set()
+    wait_for_parse(store, b"20")
+    dataset, parsed = store.get_available("Anna", sources)
+    assert parsed == 2
+
+    def build_again(df):
+        raise AssertionError("Built again instead of extended")
+
+    cube = store.derived(dataset, "daily_cube", build_again)
+    # Only the ten days the second export adds are new
+    assert extended == [10]
+    expected = build_daily_cube(dataset.df)
+    assert cube.days.equals(expected.days)
+    np.testing.assert_array_equal(cube.values, expected.values)
+
+
+def test_extended_cube_gets_metrics_of_later_exports():
+    released = {b"10": threading.Event(), b"20": threading.Event()}
+
+    def parse(source):
+        assert released[source].wait(5)
+        # The first export is from before Garmin exported distances
+        df = frame(int(source))
+        return df.drop(columns="Distans") if source == b"10" else df
+
+    store = AthleteStore(parse=parse, workers=2, extenders={"daily_cube": extend_cube})
+    sources = [b"10", b"20"]
+    store.get_available("Anna", sources)
+    released[b"10"].set()
+    wait_for_parse(store, b"10")
+    partial_dataset, _ = store.get_available("Anna", sources)
+    store.derived(partial_dataset, "daily_cube", build_daily_cube)
+
+    released[b"20"].set()
+    wait_for_parse(store, b"20")
+    dataset, _ = store.get_available("Anna", sources)
+    cube = store.derived(dataset, "daily_cube", None)
+
+    expected = build_daily_cube(dataset.df)
+    assert "Distans" in cube.metrics
+    assert cube.metrics == expected.metrics
+    np.testing.assert_array_equal(cube.values, expected.values)
+
+
+def test_finished_parses_are_stored_within_the_budget():
+    store = AthleteStore(parse=lambda source: frame(int(source)))
+    # The export is never asked for again once it is parsed
+    store.get_available("Anna", [b"10"])
+    store._executor.shutdown(wait=True)
+
+    assert store.parsed_count([b"10"]) == 1
+    assert store._parses == {}
+    assert store.used_bytes == frame_bytes(compact_frame(frame(10), prune=True))
+
+
+def test_uploads_are_hashed_once(monkeypatch):
+    hashed = []
+    monkeypatch.setattr(
+        "athletes.content_key", lambda data: hashed.append(data) or data.decode()
+    )
+    upload = io.BytesIO(b"10")
+    upload.file_id = "upload-1"
+    store = AthleteStore(load=lambda sources: frame(10))
+
+    store.get("Anna", [upload])
+    store.get("Anna", [upload])
+    store.parsed_count([upload])
+
+    assert hashed == [b"10"]
+
+
+def test_get_available_parses_again_after_a_failure():
+    calls = []
+
+    def parse(source):
+        calls.append(source)
+        if len(calls) == 1:
+            raise ValueError("Not an export")
+        return frame(1)
+
+    store = AthleteStore(parse=parse)
+    assert store.get_available("Anna", [b"1"]) == (None, 0)
+    wait_for_parse(store, b"1")
+    with pytest.raises(ValueError):
+        store.get_available("Anna", [b"1"])
+
+    assert store.get_available("Anna", [b"1"]) == (None, 0)
+    wait_for_parse(store, b"1")
+    dataset, parsed = store.get_available("Anna", [b"1"])
+    assert parsed == 1
+    assert len(dataset.df) == 1
+    assert len(calls) == 2
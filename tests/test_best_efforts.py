@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from best_efforts import best_efforts, build_best_effort_index
+from filters import build_activity_index
+from load_data import load_data
+
+TEST_FILE = Path("tests/testfiles/activities.csv")
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame(
+        {
+            "Aktivitetstyp": ["Löpning", "Löpning", "Cykling", "Löpning", "Löpning"],
+            "Distans": [10.0, 10.2, 10.1, 5.0, 10.4],
+            "Tid": [0.75, 0.7, 0.3, 0.4, np.nan],
+            "Medeltempo": pd.to_timedelta(
+                ["00:04:30", None, "00:01:47", "00:04:48", "00:04:10"]
+            ),
+        },
+        index=pd.to_datetime(
+            ["2024-01-01", "2024-02-01", "2024-03-01", "2024-04-01", "2024-05-01"]
+        ),
+    )
+
+
+def test_best_efforts_by_time(sample_df):
+    index = build_best_effort_index(build_activity_index(sample_df))
+
+    result = best_efforts(index, "Löpning", 9.8, 10.5, n=10)
+
+    # The activity without a time is no effort, nor are other types or
+    # distances
+    assert list(result.index) == list(pd.to_datetime(["2024-02-01", "2024-01-01"]))
+    assert result["Tid"].tolist() == [pd.Timedelta("42min"), pd.Timedelta("45min")]
+
+
+def test_best_efforts_by_pace_puts_missing_last(sample_df):
+    index = build_best_effort_index(build_activity_index(sample_df))
+
+    result = best_efforts(index, "Löpning", 9.8, 10.5, by="Medeltempo")
+
+    assert list(result.index) == list(pd.to_datetime(["2024-01-01", "2024-02-01"]))
+
+
+def test_best_efforts_range_is_inclusive(sample_df):
+    index = build_best_effort_index(build_activity_index(sample_df))
+
+    result = best_efforts(index, "Löpning", 5.0, 10.0)
+
+    assert result["Distans"].tolist() == [5.0, 10.0]
+
+
+def test_best_efforts_unknown_activity(sample_df):
+    index = build_best_effort_index(build_activity_index(sample_df))
+
+    assert len(best_efforts(index, "Simning", 0, 100)) == 0
+    with pytest.raises(ValueError):
+        best_efforts(index, "Löpning", 0, 100, by="Distans")
+
+
+@pytest.mark.parametrize("n", [1, 3, 100])
+def test_best_efforts_match_sorting(n):
+    df = load_data(TEST_FILE)
+    index = build_best_effort_index(build_activity_index(df))
+
+    result = best_efforts(index, "Löpning", 4.0, 12.0, n=n)
+
+    runs = df[(df["Aktivitetstyp"] == "Löpning") & df["Distans"].between(4.0, 12.0)]
+    expected = runs.sort_values("Tid", kind="stable").head(n)
+    expected_times = pd.to_timedelta(expected["Tid"], unit="h").dt.round("s")
+    assert result["Tid"].tolist() == expected_times.tolist()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_data import cap_points, chart_data, format_labels
+
+
+@pytest.fixture
+def daily():
+    days = pd.date_range("2020-01-01", periods=10, freq="D")
+    return pd.Series(np.arange(10, dtype="float64"), index=days)
+
+
+def test_short_data_is_not_capped(daily):
+    result = chart_data(daily, "%Y-%m-%d", max_points=10)
+
+    assert result.tolist() == daily.tolist()
+    assert result.index[0] == "2020-01-01"
+
+
+def test_sum_keeps_the_total(daily):
+    result = chart_data(daily, "%m-%d", max_points=4)
+
+    # Buckets of 3 counted from the end, the first one gets what is left
+    assert result.index.tolist() == ["01-01", "01-02", "01-05", "01-08"]
+    assert result.tolist() == [0.0, 6.0, 15.0, 24.0]
+
+
+def test_window_keeps_the_last_periods(daily):
+    result = chart_data(daily, "%m-%d", max_points=3, strategy="window")
+
+    assert result.index.tolist() == ["01-08", "01-09", "01-10"]
+    assert result.tolist() == [7.0, 8.0, 9.0]
+
+
+def test_cap_points_frame():
+    df = pd.DataFrame({"a": np.ones(1000), "b": np.arange(1000.0)})
+
+    result = cap_points(df, max_points=100)
+
+    assert len(result) == 100
+    pd.testing.assert_series_equal(result.sum(), df.sum())
+
+
+def test_cap_points_keeps_missing_bars():
+    values = np.ones(1000)
+    values[:600] = np.nan
+    values[800] = np.nan
+    df = pd.DataFrame({"a": values, "b": np.ones(1000)})
+
+    result = cap_points(df, max_points=100)
+
+    assert result["a"].isna().sum() == 60
+    assert result["a"].sum() == 399
+    assert not result["b"].isna().any()
+
+
+def test_cap_points_unknown_strategy(daily):
+    with pytest.raises(ValueError):
+        cap_points(daily, max_points=3, strategy="mean")
+
+
+@pytest.mark.parametrize("freq", ["D", "W", "ME", "YE"])
+def test_format_labels_matches_strftime(freq):
+    index = pd.date_range("2019-12-01", periods=30, freq=freq)
+
+    result = format_labels(index, "%Y-%m-%d")
+
+    assert result.tolist() == index.strftime("%Y-%m-%d").tolist()
+    # Reused while the range is the same
+    assert format_labels(index.copy(), "%Y-%m-%d") is result
+
+
+def test_format_labels_irregular_index():
+    index = pd.DatetimeIndex(["2020-01-01", "2020-03-01"])
+
+    assert format_labels(index, "%Y-%m").tolist() == ["2020-01", "2020-03"]
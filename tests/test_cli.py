@@ -0,0 +1,73 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from cli import aggregate_tables, group_exports, main, process_athlete
+from filters import filter_activities
+from load_data import load_data
+from metrics import aggregate_over_time, select_metric_and_drop_zeros
+
+TEST_FILE = Path("tests/testfiles/activities.csv")
+
+
+@pytest.fixture
+def export_dir(tmp_path):
+    directory = tmp_path / "exports"
+    directory.mkdir()
+    shutil.copy(TEST_FILE, directory / "Activities-24-03-26.csv")
+    shutil.copy(TEST_FILE, directory / "Staffan-Activities-26-02-11.csv")
+    (directory / "notes.csv").write_text("not an export\n")
+    return directory
+
+
+def test_group_exports(export_dir):
+    groups = group_exports(export_dir, "me")
+
+    assert sorted(groups) == ["Staffan", "me"]
+    assert [p.name for p in groups["me"]] == ["Activities-24-03-26.csv"]
+
+
+def test_aggregate_tables_match_aggregate_over_time():
+    df = load_data(TEST_FILE)
+
+    aggregates, rest = aggregate_tables(df)
+
+    selected = aggregates[
+        (aggregates["Frequency"] == "W")
+        & (aggregates["Aktivitetstyp"] == "Löpning")
+        & (aggregates["Metric"] == "Distans")
+    ]
+    expected = aggregate_over_time(
+        select_metric_and_drop_zeros(filter_activities(df, ["Löpning"]), "Distans"),
+        "W",
+    )
+    pd.testing.assert_series_equal(
+        pd.Series(
+            selected["Value"].to_numpy(), index=pd.DatetimeIndex(selected["Datum"])
+        ),
+        expected,
+        check_names=False,
+        check_freq=False,
+    )
+    assert set(rest["Frequency"]) == {"D", "W", "ME", "YE"}
+
+
+def test_main_writes_tables_per_athlete(export_dir, tmp_path):
+    output_dir = tmp_path / "out"
+
+    assert main([str(export_dir), str(output_dir), "--jobs", "1"]) == 0
+
+    for athlete in ["Staffan", "default"]:
+        assert len(pd.read_parquet(output_dir / athlete / "aggregates.parquet")) > 0
+        assert len(pd.read_parquet(output_dir / athlete / "rest_days.parquet")) > 0
+
+
+def test_process_athlete_counts_activities(export_dir, tmp_path):
+    single = [export_dir / "Activities-24-03-26.csv"]
+    both = [*single, export_dir / "Staffan-Activities-26-02-11.csv"]
+
+    # Streamed or merged, the count is of activities, not of daily sums
+    assert process_athlete("a", single, tmp_path) == len(load_data(TEST_FILE))
+    assert process_athlete("b", both, tmp_path) == len(load_data(list(both)))
@@ -0,0 +1,60 @@
+import pandas as pd
+
+from compact import UI_COLUMNS, compact_frame, memory_report
+from load_data import load_data
+from metrics import SUMMABLE_COLUMNS, get_summable_metrics
+
+csv_file = "tests/testfiles/activities.csv"
+
+
+def test_compact_dtypes():
+    df = compact_frame(load_data(csv_file))
+
+    assert isinstance(df["Aktivitetstyp"].dtype, pd.CategoricalDtype)
+    assert df["Steg"].dtype == "Int32"
+    assert df["Kalorier"].dtype == "Int32"
+    assert df["Distans"].dtype == "float32"
+    assert df["Tid"].dtype == "float32"
+    # Columns without a compact dtype are left alone
+    assert df["Namn"].dtype == object
+    assert pd.api.types.is_timedelta64_dtype(df["Medeltempo"])
+    assert df.iloc[0]["Steg"] == 6234
+
+
+def test_compact_keeps_values():
+    df = load_data(csv_file)
+    compact = compact_frame(df)
+
+    assert compact["Kalorier"].astype("float64").equals(df["Kalorier"])
+    assert (compact["Distans"] - df["Distans"]).abs().max() < 1e-4
+
+
+def test_fractional_counter_falls_back_to_float32():
+    df = pd.DataFrame({"Aktivitetstyp": ["Löpning", "Löpning"], "Steg": [1.5, 2]})
+
+    assert compact_frame(df)["Steg"].dtype == "float32"
+
+
+def test_prune_keeps_summable_and_ui_columns():
+    df = load_data(csv_file)
+    compact = compact_frame(df, prune=True, keep=["Medelpuls"])
+
+    expected = {
+        col
+        for col in df.columns
+        if col in SUMMABLE_COLUMNS or col in UI_COLUMNS or col == "Medelpuls"
+    }
+    assert set(compact.columns) == expected
+    assert get_summable_metrics(compact) == get_summable_metrics(df)
+
+
+def test_memory_report():
+    df = load_data(csv_file)
+    compact = compact_frame(df, prune=True)
+
+    report = memory_report(df, compact)
+
+    assert report.loc["Namn", "after"] == 0
+    assert report.loc["Total", "before"] == df.memory_usage(deep=True).sum()
+    assert report.loc["Total", "after"] == compact.memory_usage(deep=True).sum()
+    assert report.loc["Total", "saved"] > 0
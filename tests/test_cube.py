@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import build_daily_cube, compare_rollup, daily_sums, extend_cube, rollup
+from filters import filter_activities
+from load_data import load_data
+from metrics import aggregate_over_time, select_metric_and_drop_zeros
+
+csv_file = "tests/testfiles/activities.csv"
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame(
+        {
+            "Aktivitetstyp": ["Löpning", "Cykling", "Löpning", "Löpning"],
+            "Distans": [5.0, 20.0, 2.0, np.nan],
+            "Tid": [0.5, 1.0, 0.2, 1.0],
+        },
+        index=pd.to_datetime(
+            [
+                "2024-01-01 13:12:11",
+                "2024-01-02 19:01:01",
+                "2024-01-02 22:01:01",
+                "2024-01-08 01:34:34",
+            ]
+        ),
+    )
+
+
+def test_build_daily_cube(sample_df):
+    cube = build_daily_cube(sample_df)
+
+    assert cube.metrics == ["Distans", "Tid"]
+    assert set(cube.activities) == {"Löpning", "Cykling"}
+    assert len(cube.days) == 8
+    assert cube.values.shape == (8, 2, 2)
+    assert daily_sums(cube, ["Löpning"], "Distans").tolist() == [
+        5.0,
+        2.0,
+        0.0,
+        0.0,
+        0.0,
+        0.0,
+        0.0,
+        0.0,
+    ]
+
+
+def test_rollup_weekly(sample_df):
+    result = rollup(build_daily_cube(sample_df), ["Löpning", "Cykling"], "Tid", "W")
+
+    expected = pd.Series(
+        [0.0, 1.7, 1.0],
+        index=pd.to_datetime(["2023-12-31", "2024-01-07", "2024-01-14"]),
+        name="Tid",
+    )
+    assert result.index.equals(expected.index)
+    assert np.allclose(result, expected)
+
+
+def test_rollup_unknown_selection_is_empty(sample_df):
+    result = rollup(build_daily_cube(sample_df), ["Simning"], "Distans", "D")
+
+    assert result.empty
+
+
+@pytest.mark.parametrize("freq", ["D", "W", "ME", "YE"])
+@pytest.mark.parametrize(
+    "activities", [["Löpning"], ["Löpning", "Simbassäng", "Cykling"]]
+)
+@pytest.mark.parametrize("metric", ["Distans", "Tid", "Kalorier"])
+def test_rollup_matches_aggregate_over_time(freq, activities, metric):
+    df = load_data(csv_file)
+    cube = build_daily_cube(df)
+    s = select_metric_and_drop_zeros(filter_activities(df, activities), metric)
+
+    for start, end in [(None, None), (df.index.min(), df.index.max())]:
+        expected = aggregate_over_time(s, freq, start, end)
+        result = rollup(cube, activities, metric, freq, start, end)
+
+        assert result.index.equals(expected.index)
+        assert np.allclose(result, expected)
+
+
+def test_compare_rollup_shares_one_period():
+    first = pd.DataFrame(
+        {"Aktivitetstyp": ["Löpning"], "Distans": [5.0]},
+        index=pd.to_datetime(["2024-01-03"]),
+    )
+    second = pd.DataFrame(
+        {"Aktivitetstyp": ["Löpning", "Cykling"], "Distans": [7.0, 20.0]},
+        index=pd.to_datetime(["2024-01-10", "2024-01-20"]),
+    )
+    cubes = {"Anna": build_daily_cube(first), "Bo": build_daily_cube(second)}
+
+    result = compare_rollup(cubes, ["Löpning"], "Distans", "W")
+
+    assert list(result.columns) == ["Anna", "Bo"]
+    assert list(result.index) == list(
+        pd.to_datetime(["2023-12-31", "2024-01-07", "2024-01-14"])
+    )
+    assert result["Anna"].tolist() == [0.0, 5.0, 0.0]
+    assert result["Bo"].tolist() == [0.0, 0.0, 7.0]
+
+
+@pytest.mark.parametrize("newer", [True, False])
+def test_extend_cube_matches_building_from_scratch(newer):
+    df = load_data(csv_file)
+    cut = df.index < pd.Timestamp("2025-01-01")
+    old, new = (df[cut], df[~cut]) if newer else (df[~cut], df[cut])
+
+    cube = extend_cube(build_daily_cube(old), new)
+
+    expected = build_daily_cube(df)
+    assert cube.days.equals(expected.days)
+    assert sorted(cube.activities) == sorted(expected.activities)
+    for activity in expected.activities:
+        np.testing.assert_allclose(
+            daily_sums(cube, [activity], "Distans"),
+            daily_sums(expected, [activity], "Distans"),
+        )
+
+
+def test_extend_cube_with_metrics_only_the_new_rows_have():
+    df = load_data(csv_file)
+    cut = df.index < pd.Timestamp("2025-01-01")
+    # Like an older export without the training effect columns
+    old = df[cut].drop(columns=["Aerobisk Training Effect", "Kalorier"])
+
+    cube = extend_cube(build_daily_cube(old), df[~cut])
+
+    expected = build_daily_cube(pd.concat([df[~cut], old]))
+    assert cube.metrics == expected.metrics
+    assert cube.days.equals(expected.days)
+    for activity in expected.activities:
+        for metric in ["Aerobisk Training Effect", "Kalorier", "Distans"]:
+            np.testing.assert_allclose(
+                daily_sums(cube, [activity], metric),
+                daily_sums(expected, [activity], metric),
+            )
+
+
+def test_extend_cube_with_new_activity_type(sample_df):
+    cube = build_daily_cube(sample_df)
+    new = pd.DataFrame(
+        {"Aktivitetstyp": ["Yoga"], "Distans": [0.0], "Tid": [1.0]},
+        index=pd.to_datetime(["2024-02-01"]),
+    )
+
+    extended = extend_cube(cube, new)
+
+    assert extended.activities == [*cube.activities, "Yoga"]
+    assert daily_sums(extended, ["Yoga"], "Tid")[-1] == 1.0
+    assert extend_cube(cube, new.iloc[:0]) is cube
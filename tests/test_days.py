@@ -0,0 +1,22 @@
+import pandas as pd
+
+from days import day_numbers, day_positions, day_range
+
+
+def test_day_positions():
+    index = pd.to_datetime(["2024-01-03 18:00", "2024-01-01 07:00", "2024-01-03 00:00"])
+
+    positions, days = day_positions(index)
+
+    assert positions.tolist() == [2, 0, 2]
+    assert list(days) == list(pd.date_range("2024-01-01", "2024-01-03"))
+    assert days.freq == "D"
+
+
+def test_day_range_round_trips_day_numbers():
+    index = pd.date_range("1969-12-30", periods=5, freq="D")
+
+    (first,) = day_numbers(index[:1])
+
+    assert first == -2
+    assert day_range(first, 5).equals(index)
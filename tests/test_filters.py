@@ -1,6 +1,6 @@
 import pandas as pd
 
-from filters import filter_activities
+from filters import build_activity_index, filter_activities, select_activities
 
 
 def test_filter_activities_keeps_only_selected_types():
@@ -41,3 +41,52 @@ def test_filter_activities_with_empty_filter_list():
     result = filter_activities(df, [])
 
     assert result.empty
+
+
+def test_select_activities_matches_filter_activities():
+    df = pd.DataFrame(
+        {
+            "Aktivitetstyp": ["Löpning", "Cykling", "Löpband", "Löpning", "Simbassäng"],
+            "Distans": [5, 10, 7, 2, 5],
+        },
+        index=pd.date_range("2024-01-01", periods=5),
+    )
+    index = build_activity_index(df)
+
+    for activities in [["Löpning"], ["Löpning", "Cykling"], ["Simbassäng", "Löpband"]]:
+        result = select_activities(index, activities)
+        expected = filter_activities(df, activities)
+
+        assert result.sort_index().equals(expected)
+
+
+def test_select_single_activity_keeps_row_order():
+    df = pd.DataFrame(
+        {
+            "Aktivitetstyp": ["Löpning", "Cykling", "Löpning", "Löpning"],
+            "Distans": [5, 10, 7, 2],
+        }
+    )
+
+    result = select_activities(build_activity_index(df), ["Löpning"])
+
+    assert result["Distans"].tolist() == [5, 7, 2]
+
+
+def test_select_activities_with_unknown_or_no_activities():
+    df = pd.DataFrame({"Aktivitetstyp": ["Löpning"], "Distans": [5]})
+    index = build_activity_index(df)
+
+    assert select_activities(index, ["Swim"]).empty
+    assert select_activities(index, []).empty
+    assert list(select_activities(index, []).columns) == ["Aktivitetstyp", "Distans"]
+
+
+def test_select_activities_copy_is_independent():
+    df = pd.DataFrame({"Aktivitetstyp": ["Löpning", "Cykling"], "Distans": [5.0, 10.0]})
+    index = build_activity_index(df)
+
+    result = select_activities(index, ["Löpning"], copy=True)
+    result["Distans"] = 0.0
+
+    assert select_activities(index, ["Löpning"])["Distans"].tolist() == [5.0]
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fitness import (
+    ACUTE_DAYS,
+    CHRONIC_DAYS,
+    TRAINING_EFFECT_LOAD_PER_HOUR,
+    FitnessState,
+    activity_load,
+    add_activities,
+    daily_training_load,
+    extend_fitness,
+    fitness_model,
+)
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame(
+        {
+            "Aktivitetstyp": ["Löpning", "Cykling", "Yoga"],
+            "Training Stress Score®": [80.0, 0.0, np.nan],
+            "Aerobisk Training Effect": [3.0, 2.5, np.nan],
+            "Tid": [1.0, 2.0, 1.0],
+        },
+        index=pd.to_datetime(
+            ["2024-01-01 08:00", "2024-01-01 18:00", "2024-01-04 07:00"]
+        ),
+    )
+
+
+def reference_model(loads, ctl=0.0, atl=0.0):
+    rows = []
+    for load in loads:
+        tsb = ctl - atl
+        ctl += (load - ctl) / CHRONIC_DAYS
+        atl += (load - atl) / ACUTE_DAYS
+        rows.append((ctl, atl, tsb))
+    return np.array(rows)
+
+
+def test_activity_load_falls_back_to_training_effect(sample_df):
+    load = activity_load(sample_df)
+
+    assert load.tolist() == [80.0, 2.5 * 2.0 * TRAINING_EFFECT_LOAD_PER_HOUR, 0.0]
+
+
+def test_daily_training_load_has_every_day(sample_df):
+    load = daily_training_load(sample_df)
+
+    assert list(load.index) == list(pd.date_range("2024-01-01", "2024-01-04"))
+    assert load.tolist() == [80.0 + 5.0 * TRAINING_EFFECT_LOAD_PER_HOUR, 0, 0, 0]
+
+
+def test_fitness_model_matches_recurrence():
+    loads = np.random.default_rng(0).random(300) * 100
+    daily = pd.Series(loads, index=pd.date_range("2024-01-01", periods=300))
+
+    model = fitness_model(daily)
+
+    np.testing.assert_allclose(model[["CTL", "ATL", "TSB"]], reference_model(loads))
+
+
+def test_fitness_model_continues_from_state():
+    loads = np.array([50.0, 0.0, 70.0])
+    daily = pd.Series(loads, index=pd.date_range("2024-01-01", periods=3))
+    state = FitnessState(pd.Timestamp("2023-12-31"), ctl=40.0, atl=60.0)
+
+    model = fitness_model(daily, state)
+
+    np.testing.assert_allclose(
+        model[["CTL", "ATL", "TSB"]], reference_model(loads, 40.0, 60.0)
+    )
+
+
+def test_extend_fitness_matches_full_model():
+    loads = np.random.default_rng(1).random(100) * 100
+    daily = pd.Series(loads, index=pd.date_range("2024-01-01", periods=100))
+
+    # The new data may repeat days the model already has
+    extended = extend_fitness(fitness_model(daily.iloc[:60]), daily.iloc[50:])
+
+    pd.testing.assert_frame_equal(extended, fitness_model(daily), check_freq=False)
+
+
+def test_extend_fitness_fills_days_without_training():
+    daily = pd.Series(
+        [10.0, 0.0, 0.0, 40.0], index=pd.date_range("2024-01-01", periods=4)
+    )
+    model = fitness_model(daily.iloc[:1])
+
+    extended = extend_fitness(model, daily.iloc[[3]])
+
+    pd.testing.assert_frame_equal(extended, fitness_model(daily), check_freq=False)
+
+
+def test_extend_fitness_without_new_days():
+    daily = pd.Series([10.0, 20.0], index=pd.date_range("2024-01-01", periods=2))
+    model = fitness_model(daily)
+
+    assert extend_fitness(model, daily.iloc[:1]) is model
+
+
+def test_extend_fitness_with_load_added_to_covered_days():
+    loads = np.zeros(10)
+    daily = pd.Series(loads, index=pd.date_range("2024-01-01", periods=10))
+    model = fitness_model(daily.iloc[:5])
+    # The fifth day's afternoon activity arrives with the next export
+    daily.iloc[4] = 100.0
+
+    extended = extend_fitness(model, daily.iloc[4:])
+
+    pd.testing.assert_frame_equal(extended, fitness_model(daily), check_freq=False)
+    assert extended.loc["2024-01-05", "ATL"] == pytest.approx(100.0 / ACUTE_DAYS)
+
+
+def test_extend_fitness_with_earlier_days():
+    daily = pd.Series([30.0, 0.0, 50.0], index=pd.date_range("2024-01-01", periods=3))
+
+    extended = extend_fitness(fitness_model(daily.iloc[2:]), daily.iloc[:2])
+
+    pd.testing.assert_frame_equal(extended, fitness_model(daily), check_freq=False)
+
+
+def test_add_activities(sample_df):
+    # The afternoon ride arrives with a later export
+    old, new = sample_df.iloc[[0, 2]], sample_df.iloc[[1]]
+
+    extended = add_activities(fitness_model(daily_training_load(old)), new)
+
+    pd.testing.assert_frame_equal(
+        extended, fitness_model(daily_training_load(sample_df)), check_freq=False
+    )
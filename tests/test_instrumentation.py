@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+
+from instrumentation import Profiler, write_jsonl
+
+
+def test_stage_counts_calls_and_time():
+    profiler = Profiler(trace_memory=False)
+    run = profiler.begin_run()
+
+    for _ in range(3):
+        with profiler.stage("filter"):
+            pass
+    with profiler.stage("aggregate"):
+        pass
+    profiler.end_run()
+
+    assert list(run.stages) == ["filter", "aggregate"]
+    assert run.stages["filter"].calls == 3
+    assert run.stages["aggregate"].calls == 1
+    assert run.seconds >= run.stages["filter"].seconds >= 0
+
+
+def test_stage_outside_run_is_not_recorded():
+    profiler = Profiler(trace_memory=False)
+
+    with profiler.stage("filter"):
+        pass
+
+    assert profiler.run is None
+
+
+def test_nested_stage_peaks():
+    profiler = Profiler()
+    run = profiler.begin_run()
+
+    with profiler.stage("outer"):
+        with profiler.stage("inner"):
+            data = np.ones(1_000_000)
+            del data
+        small = np.ones(1000)
+        del small
+    profiler.end_run()
+
+    assert run.stages["inner"].peak_bytes >= 8_000_000
+    # The inner allocation also counts towards the outer peak, even though
+    # tracemalloc's peak was reset when the inner stage started
+    assert run.stages["outer"].peak_bytes >= run.stages["inner"].peak_bytes
+
+
+def test_write_jsonl(tmp_path):
+    profiler = Profiler(trace_memory=False)
+    run = profiler.begin_run()
+    with profiler.stage("load_datasets"):
+        pass
+    profiler.end_run()
+    path = tmp_path / "profile.jsonl"
+
+    write_jsonl(run, path)
+    write_jsonl(run, path)
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    record = json.loads(lines[0])
+    assert record["stages"][0]["stage"] == "load_datasets"
+    assert record["stages"][0]["calls"] == 1
+    assert record["name"] == "app"
+
+
+def test_named_run_ends():
+    profiler = Profiler(trace_memory=False)
+    run = profiler.begin_run("rest_days_section")
+    assert profiler.end_run() is run
+
+    # Stages after the run has ended aren't added to it
+    with profiler.stage("rest_days"):
+        pass
+
+    assert run.name == "rest_days_section"
+    assert run.stages == {}
+    assert profiler.end_run() is None
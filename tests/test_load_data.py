@@ -1,6 +1,11 @@
 import pandas as pd
+import pyarrow as pa
 
-from load_data import load_data
+import load_data as load_data_module
+from filters import filter_activities
+from load_data import LazyActivityFrame, activity_keys, load_data
+from metrics import get_summable_metrics, select_metric_and_drop_zeros
+from schema import COLUMNS
 
 csv_file = "tests/testfiles/activities.csv"
 
@@ -114,3 +119,110 @@ def test_hour_format_columns():
     assert df.iloc[0]["Tid"] == (46 * 60 + 46) / 3600
     assert df.iloc[0]["Färdtid"] == (38 * 60 + 47) / 3600
     assert df.iloc[0]["Total tid"] == (46 * 60 + 48) / 3600
+
+
+def _write_rows(path, lines, rows):
+    path.write_text("".join([lines[0]] + [lines[i] for i in rows]), encoding="utf-8")
+    return str(path)
+
+
+def test_merge_exports_deduplicates_activities(tmp_path):
+    with open(csv_file, encoding="utf-8") as f:
+        lines = f.readlines()
+    older = _write_rows(tmp_path / "older.csv", lines, range(3, 40))
+    newer = _write_rows(tmp_path / "newer.csv", lines, range(3, 60))
+
+    df = load_data([older, newer])
+
+    assert len(df) == 57
+    assert not activity_keys(df).duplicated().any()
+    assert df.index.is_monotonic_decreasing
+    assert df.equals(load_data(newer))
+
+
+def test_merge_only_converts_new_rows(tmp_path, monkeypatch):
+    with open(csv_file, encoding="utf-8") as f:
+        lines = f.readlines()
+    history = load_data(_write_rows(tmp_path / "history.csv", lines, range(10, 40)))
+    newer = _write_rows(tmp_path / "newer.csv", lines, range(3, 40))
+
+    converted_rows = []
+    original_convert = load_data_module.convert
+
+    def counting_convert(df):
+        converted_rows.append(len(df))
+        return original_convert(df)
+
+    monkeypatch.setattr(load_data_module, "convert", counting_convert)
+    df = load_data(newer, history=history)
+
+    assert converted_rows == [7]
+    assert len(df) == 37
+    assert df.index.is_monotonic_decreasing
+
+
+def test_merge_with_nothing_new_returns_history():
+    history = load_data(csv_file)
+
+    assert load_data(csv_file, history=history) is history
+
+
+def test_lazy_frame_matches_load_data():
+    lazy = load_data(csv_file, lazy=True)
+
+    assert isinstance(lazy, LazyActivityFrame)
+    pd.testing.assert_frame_equal(lazy.to_frame(), load_data(csv_file))
+
+
+def test_lazy_frame_converts_columns_on_first_access():
+    lazy = load_data(csv_file, lazy=True)
+    assert lazy.converted_columns == ["Aktivitetstyp"]
+
+    distance = lazy["Distans"]
+
+    assert lazy.converted_columns == ["Aktivitetstyp", "Distans"]
+    pd.testing.assert_series_equal(distance, load_data(csv_file)["Distans"])
+
+
+def test_metrics_on_lazy_frame():
+    df = load_data(csv_file)
+    lazy = load_data(csv_file, lazy=True)
+
+    assert get_summable_metrics(lazy) == get_summable_metrics(df)
+
+    selected = filter_activities(lazy, ["Simbassäng"])
+    pd.testing.assert_series_equal(
+        select_metric_and_drop_zeros(selected, "Distans"),
+        select_metric_and_drop_zeros(filter_activities(df, ["Simbassäng"]), "Distans"),
+    )
+    # Metrics only need the summable columns
+    assert "Medelpuls" not in lazy.converted_columns
+
+
+def test_arrow_dtypes():
+    df = load_data(csv_file, dtype_backend="pyarrow")
+    numpy_df = load_data(csv_file)
+
+    assert all(
+        isinstance(dtype, pd.ArrowDtype)
+        for name, dtype in df.dtypes.items()
+        if name in COLUMNS
+    )
+    assert str(df["Aktivitetstyp"].dtype.pyarrow_dtype) == (
+        "dictionary<values=string, indices=int32, ordered=0>"
+    )
+    for col in ["Tid", "Färdtid"]:
+        assert pa.types.is_duration(df[col].dtype.pyarrow_dtype)
+    # Missing values are nulls, not NaN or "nan" strings
+    assert df["Medelpuls"].isna().sum() == numpy_df["Medelpuls"].isna().sum()
+    assert df["Namn"].isna().sum() == (numpy_df["Namn"] == "nan").sum()
+    assert df.memory_usage(deep=True).sum() < numpy_df.memory_usage(deep=True).sum()
+
+
+def test_arrow_dtypes_merge_with_history():
+    history = load_data(csv_file, dtype_backend="pyarrow")
+
+    merged = load_data(csv_file, history=history, dtype_backend="pyarrow")
+
+    # The same export again adds nothing
+    pd.testing.assert_frame_equal(merged, history)
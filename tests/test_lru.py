@@ -0,0 +1,50 @@
+from lru import BoundedLRU
+
+
+def test_lru_evicts_least_recently_used():
+    lru = BoundedLRU(max_entries=2)
+
+    lru.put("a", 1, 0)
+    lru.put("b", 2, 0)
+    assert lru.get("a") == 1
+    lru.put("c", 3, 0)
+
+    assert "b" not in lru
+    assert lru.get("b") is None
+    assert (lru.hits, lru.misses, lru.evictions) == (1, 1, 1)
+
+
+def test_lru_keeps_the_value_already_there():
+    lru = BoundedLRU()
+
+    assert lru.put("a", [1], 8) == [1]
+    assert lru.put("a", [2], 8) == [1]
+    assert lru.used_bytes == 8
+
+
+def test_lru_evicts_over_budget_but_keeps_the_newest():
+    lru = BoundedLRU(max_bytes=10)
+
+    lru.put("a", 1, 6)
+    lru.put("b", 2, 6)
+    assert list(lru._values) == ["b"]
+
+    lru.put("c", 3, 4)
+    # b grows past the budget, so c goes even though it is newer
+    lru.grow("b", 20)
+    assert list(lru._values) == ["b"]
+    assert lru.used_bytes == 26
+
+
+def test_lru_pop_and_clear():
+    lru = BoundedLRU()
+    lru.put("a", 1, 5)
+    lru.put("b", 2, 5)
+
+    assert lru.pop("a") == 1
+    assert lru.pop("a") is None
+    assert lru.used_bytes == 5
+
+    lru.clear()
+    assert len(lru) == 0
+    assert lru.used_bytes == 0
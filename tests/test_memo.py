@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from memo import AggregateMemo, fingerprint
+from metrics import aggregate_over_time
+
+
+@pytest.fixture
+def s():
+    index = pd.date_range("2024-01-01", periods=100, freq="17h")
+    return pd.Series(np.arange(100, dtype="float64"), index=index)
+
+
+def counting(calls):
+    def aggregate(s, freq, start, end):
+        calls.append(freq)
+        return aggregate_over_time(s, freq, start, end)
+
+    return aggregate
+
+
+def test_memo_matches_aggregate_over_time(s):
+    memo = AggregateMemo()
+
+    for freq in ["D", "W", "ME", "YE"]:
+        pd.testing.assert_series_equal(
+            memo.aggregate(s, freq), aggregate_over_time(s, freq)
+        )
+
+
+def test_memo_hits_equal_series(s):
+    calls = []
+    memo = AggregateMemo(aggregate=counting(calls))
+
+    first = memo.aggregate(s, "W")
+    # An equal series, not the same object, is found by its fingerprint
+    second = memo.aggregate(s.copy(), "W")
+    memo.aggregate(s, "ME")
+
+    assert calls == ["W", "ME"]
+    pd.testing.assert_series_equal(first, second)
+    stats = memo.stats()
+    assert (stats.hits, stats.misses, stats.evictions) == (1, 2, 0)
+    assert stats.entries == 2
+
+
+def test_memo_returns_copies(s):
+    memo = AggregateMemo()
+
+    out = memo.aggregate(s, "W")
+    out.iloc[0] = -1.0
+
+    assert memo.aggregate(s, "W").iloc[0] != -1.0
+
+
+def test_fingerprint_changes_with_values_and_index(s):
+    changed = s.copy()
+    changed.iloc[50] += 1
+
+    assert fingerprint(s) == fingerprint(s.copy())
+    assert fingerprint(changed) != fingerprint(s)
+    assert fingerprint(s.shift(1, freq="h")) != fingerprint(s)
+    assert fingerprint(s.iloc[:0])[0] == 0
+
+
+def test_fingerprint_changes_with_dtype_and_name(s):
+    # Equal as floats, but aggregated to a different dtype or name
+    assert fingerprint(s.astype("int64")) != fingerprint(s)
+    assert fingerprint(s.rename("Distans")) != fingerprint(s)
+
+
+def test_memo_keeps_dtype_and_name(s):
+    memo = AggregateMemo()
+    memo.aggregate(s, "W")
+
+    out = memo.aggregate(s.astype("int64").rename("Distans"), "W")
+
+    pd.testing.assert_series_equal(
+        out, aggregate_over_time(s.astype("int64").rename("Distans"), "W")
+    )
+
+
+def test_memo_evicts_least_recently_used(s):
+    calls = []
+    memo = AggregateMemo(max_entries=2, aggregate=counting(calls))
+
+    memo.aggregate(s, "D")
+    memo.aggregate(s, "W")
+    memo.aggregate(s, "D")
+    memo.aggregate(s, "ME")
+    memo.aggregate(s, "D")
+    memo.aggregate(s, "W")
+
+    # W was the least recently used when ME came in
+    assert calls == ["D", "W", "ME", "W"]
+    assert memo.stats().evictions == 2
+    assert memo.stats().entries == 2
+
+
+def test_memo_evicts_over_memory_budget(s):
+    memo = AggregateMemo(max_bytes=1)
+
+    memo.aggregate(s, "D")
+    memo.aggregate(s, "W")
+
+    # The newest entry stays even over the budget
+    stats = memo.stats()
+    assert stats.entries == 1
+    assert stats.evictions == 1
+    assert stats.used_bytes == aggregate_over_time(s, "W").memory_usage(deep=True)
+
+    memo.clear()
+    assert memo.stats().used_bytes == 0
@@ -1,12 +1,17 @@
 import pandas as pd
 import pytest
 
+from filters import filter_activities
+from load_data import load_data
 from metrics import (
     SUMMABLE_COLUMNS,
     aggregate_over_time,
+    build_metric_flags,
+    extend_aggregate,
     get_activities,
     get_days_without_activity,
     get_summable_metrics,
+    get_summable_metrics_from_flags,
     select_metric_and_drop_zeros,
 )
 
@@ -236,3 +241,100 @@ def test_select_metric_and_drop_zeros(sample_df_2):
     )
 
     assert res.equals(expected)
+
+
+def test_summable_metrics_from_flags_match_get_summable_metrics():
+    df = load_data("tests/testfiles/activities.csv")
+    flags = build_metric_flags(df)
+    activity_sets = [
+        ["Löpning"],
+        ["Styrketräning"],
+        ["Löpning", "Simbassäng"],
+        ["Cykling", "Inomhuscykling", "Löpband"],
+        get_activities(df),
+    ]
+
+    for activities in activity_sets:
+        expected = get_summable_metrics(filter_activities(df, activities))
+        assert get_summable_metrics_from_flags(flags, activities) == expected
+
+
+def test_summable_metrics_from_flags_combines_types():
+    df = pd.DataFrame(
+        {
+            "Aktivitetstyp": ["A", "A", "B", "C"],
+            "Distans": [0.0, 0.0, 5.0, 1.0],
+            "Steg": [100, 200, None, 300],
+            "Kalorier": [0, 0, 0, 0],
+        }
+    )
+    flags = build_metric_flags(df)
+
+    assert get_summable_metrics_from_flags(flags, ["A"]) == ["Steg"]
+    assert get_summable_metrics_from_flags(flags, ["A", "B"]) == ["Distans"]
+    assert get_summable_metrics_from_flags(flags, ["A", "C"]) == ["Distans", "Steg"]
+    assert get_summable_metrics_from_flags(flags, ["D"]) == []
+    assert get_summable_metrics_from_flags(flags, []) == []
+
+
+def test_summable_columns_are_unique():
+    assert len(SUMMABLE_COLUMNS) == len(set(SUMMABLE_COLUMNS))
+
+
+@pytest.mark.parametrize("metric", ["Distans", "Kalorier", "Tid"])
+@pytest.mark.parametrize("freq", ["D", "W", "ME", "YE"])
+def test_aggregate_over_time_with_arrow_dtypes(metric, freq):
+    csv_file = "tests/testfiles/activities.csv"
+    df = load_data(csv_file)
+    arrow_df = load_data(csv_file, dtype_backend="pyarrow")
+    activities = ["Simbassäng", "Löpning"]
+
+    expected = aggregate_over_time(
+        select_metric_and_drop_zeros(filter_activities(df, activities), metric), freq
+    )
+    result = aggregate_over_time(
+        select_metric_and_drop_zeros(filter_activities(arrow_df, activities), metric),
+        freq,
+    )
+
+    assert isinstance(result.dtype, pd.ArrowDtype)
+    if metric == "Tid":
+        result = result.astype("timedelta64[ns]").dt.total_seconds() / 3600
+    pd.testing.assert_series_equal(result.astype("float64"), expected, check_freq=False)
+
+
+def test_select_metric_and_drop_zeros_keeps_nulls():
+    df = pd.DataFrame(
+        {"Distans": pd.array([1.0, 0.0, None], dtype="double[pyarrow]")},
+        index=pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03"]),
+    )
+
+    result = select_metric_and_drop_zeros(df, "Distans")
+
+    # Like NaN in a float64 column
+    assert list(result.index) == list(pd.to_datetime(["2024-01-01", "2024-01-03"]))
+
+
+def test_summable_metrics_with_arrow_dtypes():
+    csv_file = "tests/testfiles/activities.csv"
+    df = load_data(csv_file)
+    arrow_df = load_data(csv_file, dtype_backend="pyarrow")
+
+    for activities in (["Löpning"], ["Yoga", "Simbassäng"]):
+        assert get_summable_metrics(
+            filter_activities(arrow_df, activities)
+        ) == get_summable_metrics(filter_activities(df, activities))
+
+
+@pytest.mark.parametrize("freq", ["D", "W", "ME", "YE"])
+def test_extend_aggregate_matches_aggregating_everything(freq):
+    df = load_data("tests/testfiles/activities.csv")
+    s = select_metric_and_drop_zeros(filter_activities(df, ["Löpning"]), "Distans")
+    # A newer export adds the activities since the last one
+    cut = s.index < pd.Timestamp("2025-10-01")
+
+    result = extend_aggregate(aggregate_over_time(s[cut], freq), s[~cut], freq)
+
+    expected = aggregate_over_time(s, freq)
+    pd.testing.assert_series_equal(result, expected, check_freq=False)
+    assert extend_aggregate(expected, s.iloc[:0], freq) is expected
@@ -0,0 +1,145 @@
+import os
+import threading
+
+import pandas as pd
+
+from load_data import load_data
+import parquet_cache
+from parquet_cache import (
+    cache_path,
+    clear_cache,
+    content_key,
+    evict,
+    invalidate_stale,
+    load_data_cached,
+    wait_for_writes,
+)
+
+csv_file = "tests/testfiles/activities.csv"
+
+
+def test_cached_frame_matches_parsed_frame(tmp_path):
+    expected = load_data(csv_file)
+
+    first = load_data_cached(csv_file, cache_dir=tmp_path)
+    second = load_data_cached(csv_file, cache_dir=tmp_path)
+
+    for df in (first, second):
+        assert df.equals(expected)
+        assert (df.dtypes == expected.dtypes).all()
+        assert isinstance(df.index, pd.DatetimeIndex)
+    assert len(list(tmp_path.glob("*.parquet"))) == 1
+
+
+def test_repeat_load_does_not_parse(tmp_path, monkeypatch):
+    load_data_cached(csv_file, cache_dir=tmp_path)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("load_data should not run on a cache hit")
+
+    monkeypatch.setattr("parquet_cache.load_data", fail)
+    with open(csv_file, "rb") as f:
+        df = load_data_cached(f, cache_dir=tmp_path)
+
+    assert len(df) == 1125
+
+
+def test_selected_columns_on_miss_and_hit(tmp_path):
+    expected = load_data(csv_file)
+    columns = ["Distans", "Tid"]
+
+    first = load_data_cached(csv_file, cache_dir=tmp_path, columns=columns)
+    wait_for_writes()
+    second = load_data_cached(csv_file, cache_dir=tmp_path, columns=columns)
+
+    for df in (first, second):
+        pd.testing.assert_frame_equal(df, expected[["Aktivitetstyp", "Distans", "Tid"]])
+    # The entry written in the background holds every column
+    assert load_data_cached(csv_file, cache_dir=tmp_path).equals(expected)
+
+
+def test_key_depends_on_content_and_parser_version():
+    assert content_key(b"a") != content_key(b"b")
+    assert content_key(b"a", parser_version=1) != content_key(b"a", parser_version=2)
+
+
+def test_stale_parser_versions_are_invalidated(tmp_path):
+    stale = cache_path(content_key(b"old", parser_version=-1), tmp_path)
+    stale.write_bytes(b"stale")
+
+    load_data_cached(csv_file, cache_dir=tmp_path)
+
+    assert not stale.exists()
+    assert invalidate_stale(tmp_path) == 0
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    paths = [tmp_path / f"v1-{i}.parquet" for i in range(3)]
+    for i, path in enumerate(paths):
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    removed = evict(tmp_path, max_bytes=200)
+
+    assert removed == 1
+    assert not paths[0].exists()
+    assert paths[1].exists() and paths[2].exists()
+
+
+def test_corrupt_entry_is_reparsed(tmp_path):
+    with open(csv_file, "rb") as f:
+        key = content_key(f.read())
+    cache_path(key, tmp_path).write_bytes(b"not parquet")
+
+    df = load_data_cached(csv_file, cache_dir=tmp_path)
+
+    assert df.equals(load_data(csv_file))
+
+
+def test_clear_cache(tmp_path):
+    load_data_cached(csv_file, cache_dir=tmp_path)
+
+    assert clear_cache(tmp_path) == 1
+    assert list(tmp_path.glob("*.parquet")) == []
+
+
+def test_failed_write_is_a_miss(tmp_path, monkeypatch):
+    def fail(self, path):
+        raise ValueError("Arrow can't write this")
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", fail)
+
+    df = load_data_cached(csv_file, cache_dir=tmp_path)
+
+    assert len(df) == len(load_data(csv_file))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_concurrent_writes_of_one_entry(tmp_path):
+    df = load_data(csv_file)
+    path = cache_path("v1-same", tmp_path)
+
+    threads = [
+        threading.Thread(target=parquet_cache._write_entry, args=(path, df))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pd.read_parquet(path).equals(df)
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+
+def test_finished_writers_are_dropped(tmp_path):
+    columns = ["Distans"]
+    for i in range(3):
+        load_data_cached(csv_file, cache_dir=tmp_path / str(i), columns=columns)
+    for thread in list(parquet_cache._pending_writes):
+        thread.join()
+
+    load_data_cached(csv_file, cache_dir=tmp_path / "last", columns=columns)
+
+    assert len(parquet_cache._pending_writes) == 1
+    wait_for_writes()
@@ -0,0 +1,125 @@
+import pandas as pd
+import pytest
+
+from filters import filter_activities
+from load_data import load_data
+from metrics import get_activities, get_days_without_activity
+from rest_days import (
+    build_rest_day_engine,
+    extend_rest_day_engine,
+    get_rest_days,
+    longest_rest_streak,
+    longest_training_streak,
+    monthly_streak_histogram,
+)
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame(
+        {
+            "Aktivitetstyp": ["Löpning", "Yoga", "Löpning", "Yoga", "Löpning"],
+        },
+        index=pd.to_datetime(
+            [
+                "2023-12-30 18:05:42",
+                "2024-01-01 07:00:00",
+                "2024-01-03 01:33:12",
+                "2024-01-04 08:00:00",
+                "2024-01-10 23:23:23",
+            ]
+        ),
+    )
+
+
+def test_rest_days(sample_df):
+    engine = build_rest_day_engine(sample_df)
+
+    result = get_rest_days(engine, [])
+
+    expected = pd.to_datetime(
+        [
+            "2023-12-31",
+            "2024-01-02",
+            "2024-01-05",
+            "2024-01-06",
+            "2024-01-07",
+            "2024-01-08",
+            "2024-01-09",
+        ]
+    )
+    assert result.index.equals(expected)
+    assert (result == 1).all()
+
+
+def test_ignored_activities_count_as_rest(sample_df):
+    engine = build_rest_day_engine(sample_df)
+
+    result = get_rest_days(engine, ["Yoga"])
+
+    assert pd.Timestamp("2024-01-01") in result.index
+    assert pd.Timestamp("2024-01-04") in result.index
+    assert len(result) == 9
+
+
+def test_streaks(sample_df):
+    engine = build_rest_day_engine(sample_df)
+
+    rest = longest_rest_streak(engine, [])
+    training = longest_training_streak(engine, [])
+
+    assert rest.length == 5
+    assert rest.start == pd.Timestamp("2024-01-05")
+    assert training.length == 2
+    assert training.start == pd.Timestamp("2024-01-03")
+    assert longest_training_streak(engine, ["Löpning", "Yoga"]).length == 0
+
+
+def test_monthly_streak_histogram(sample_df):
+    engine = build_rest_day_engine(sample_df)
+
+    histogram = monthly_streak_histogram(engine, [])
+
+    assert histogram.loc[pd.Timestamp("2023-12-01"), 1] == 1
+    assert histogram.loc[pd.Timestamp("2024-01-01"), 1] == 1
+    assert histogram.loc[pd.Timestamp("2024-01-01"), 5] == 1
+    assert histogram.to_numpy().sum() == 3
+
+
+def test_rest_days_match_get_days_without_activity():
+    df = load_data("tests/testfiles/activities.csv")
+    engine = build_rest_day_engine(df)
+    activities = get_activities(df)
+
+    for ignored in [[], ["Styrketräning"], ["Gång", "Yoga", "Konditionspass"]]:
+        active = [a for a in activities if a not in ignored]
+        expected = get_days_without_activity(
+            filter_activities(df, active), df.index.min(), df.index.max()
+        )
+
+        assert get_rest_days(engine, ignored).index.equals(expected.index)
+
+
+@pytest.mark.parametrize("cut", ["2023-06-01", "2024-06-15", "2025-01-01"])
+def test_extend_rest_day_engine_matches_building_from_scratch(cut):
+    df = load_data("tests/testfiles/activities.csv")
+    older = df.index < pd.Timestamp(cut)
+
+    for old, new in [(df[older], df[~older]), (df[~older], df[older])]:
+        engine = extend_rest_day_engine(build_rest_day_engine(old), new)
+
+        expected = build_rest_day_engine(df)
+        assert engine.days.equals(expected.days)
+        for ignored in [[], ["Löpning"], ["Yoga", "Gång"]]:
+            assert get_rest_days(engine, ignored).index.equals(
+                get_rest_days(expected, ignored).index
+            )
+
+
+def test_extend_rest_day_engine_keeps_the_original(sample_df):
+    engine = build_rest_day_engine(sample_df.iloc[:3])
+    before = {a: mask.copy() for a, mask in engine.masks.items()}
+
+    extend_rest_day_engine(engine, sample_df.iloc[3:])
+
+    assert all((engine.masks[a] == before[a]).all() for a in before)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import build_daily_cube
+from rolling import acute_chronic_ratio, daily_load, rolling_load, rolling_sum
+
+
+@pytest.mark.parametrize("window", [1, 7, 28, 42])
+def test_rolling_sum_matches_pandas(window):
+    values = np.random.default_rng(0).random(200)
+
+    result = rolling_sum(values, window)
+
+    expected = pd.Series(values).rolling(window, min_periods=1).sum().to_numpy()
+    np.testing.assert_allclose(result, expected)
+
+
+def test_rolling_sum_shorter_than_window():
+    result = rolling_sum(np.array([1.0, 2.0, 3.0]), 7)
+
+    np.testing.assert_array_equal(result, [1.0, 3.0, 6.0])
+
+
+def test_rolling_load_columns():
+    daily = pd.Series(
+        np.ones(50), index=pd.date_range("2024-01-01", periods=50, freq="D")
+    )
+
+    load = rolling_load(daily, windows=[7])
+
+    assert list(load.columns) == ["7-day sum", "7-day mean", "ACWR"]
+    assert load["7-day sum"].iloc[-1] == 7
+    assert load["7-day mean"].iloc[-1] == 1
+
+
+def test_acute_chronic_ratio():
+    values = np.concatenate([np.zeros(10), np.ones(28), np.full(7, 3.0)])
+
+    ratio = acute_chronic_ratio(values)
+
+    # Undefined until a whole chronic window has passed and while there is no
+    # load in it
+    assert np.isnan(ratio[:27]).all()
+    assert ratio[37] == pytest.approx(1.0)
+    # 7 days of 3 against 21 days of 1 and 7 days of 3
+    assert ratio[-1] == pytest.approx(3 / ((21 + 21) / 28))
+
+
+def test_daily_load_has_every_day():
+    df = pd.DataFrame(
+        {"Aktivitetstyp": ["Löpning", "Löpning"], "Distans": [5.0, 7.0]},
+        index=pd.to_datetime(["2024-01-01 08:00", "2024-01-04 18:00"]),
+    )
+
+    load = daily_load(build_daily_cube(df), ["Löpning"], "Distans")
+
+    assert load.tolist() == [5.0, 0.0, 0.0, 7.0]
+    assert load.index.freq == "D"
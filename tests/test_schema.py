@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from load_data import load_data
+from schema import COLUMNS, hours_parser, parse_duration, parse_number, parse_pace
+
+csv_file = "tests/testfiles/activities.csv"
+
+
+def test_parse_duration():
+    s = pd.Series(["00:46:46", "00:00:56.9", "1:02:03", np.nan, "6:14"])
+
+    result = parse_duration(s)
+
+    assert result.tolist()[:3] == [
+        pd.Timedelta(minutes=46, seconds=46),
+        pd.Timedelta(seconds=56.9),
+        pd.Timedelta(hours=1, minutes=2, seconds=3),
+    ]
+    assert result.iloc[3:].isna().all()
+
+
+def test_parse_pace_only_accepts_min_sec():
+    s = pd.Series(["6:22", "2:34", "32.5", np.nan])
+
+    result = parse_pace(s)
+
+    assert result.iloc[0] == pd.Timedelta(minutes=6, seconds=22)
+    assert result.iloc[1] == pd.Timedelta(minutes=2, seconds=34)
+    assert result.iloc[2:].isna().all()
+
+
+def test_parse_pace_falls_back_on_unparsable_values():
+    s = pd.Series(["6:22", "x:yz"])
+
+    result = parse_pace(s)
+
+    assert result.iloc[0] == pd.Timedelta(minutes=6, seconds=22)
+    assert pd.isna(result.iloc[1])
+
+
+def test_hours_parser():
+    s = pd.Series(["00:46:46", np.nan])
+
+    result = hours_parser(s)
+
+    assert result.iloc[0] == (46 * 60 + 46) / 3600
+    assert np.isnan(result.iloc[1])
+
+
+def test_parse_number_strips_thousands_separators():
+    s = pd.Series(["6,234", "7.34", None], dtype=object)
+
+    result = parse_number(s)
+
+    assert result.dtype == "float64"
+    assert result.iloc[0] == 6234
+    assert result.iloc[1] == 7.34
+    assert np.isnan(result.iloc[2])
+
+
+def test_schema_covers_test_file_columns():
+    header = pd.read_csv(csv_file, nrows=0).columns
+
+    assert set(header) <= set(COLUMNS)
+
+
+def test_engines_produce_the_same_frame():
+    df = load_data(csv_file)
+    df_pyarrow = load_data(csv_file, engine="pyarrow")
+
+    assert df.equals(df_pyarrow)
+    assert (df.dtypes == df_pyarrow.dtypes).all()
+
+
+def test_column_subset():
+    df = load_data(csv_file, columns=["Distans", "Tid"])
+
+    assert list(df.columns) == ["Aktivitetstyp", "Distans", "Tid"]
+    swim_rows = df[df["Aktivitetstyp"] == "Simbassäng"]
+    assert swim_rows.iloc[0]["Distans"] == 1.0
@@ -0,0 +1,180 @@
+import pandas as pd
+import pytest
+
+from athletes import Dataset
+from filters import filter_activities
+from load_data import load_data
+from metrics import (
+    SUMMABLE_COLUMNS,
+    aggregate_over_time,
+    get_activities,
+    get_summable_metrics,
+    select_metric_and_drop_zeros,
+)
+from cube import build_daily_cube, compare_rollup
+from sqlite_store import (
+    ActivityDatabase,
+    aggregate,
+    compare_aggregate,
+    connect,
+    daily_sums,
+    import_exports,
+)
+from sqlite_store import filter_activities as sql_filter_activities
+from sqlite_store import get_activities as sql_get_activities
+from sqlite_store import get_summable_metrics as sql_get_summable_metrics
+
+csv_file = "tests/testfiles/activities.csv"
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(tmp_path / "activities.sqlite")
+    import_exports(conn, "Me", csv_file)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def df():
+    return load_data(csv_file)
+
+
+def test_import_skips_stored_activities(conn, df):
+    assert import_exports(conn, "Me", csv_file) == 0
+    # Another dataset's activities are kept apart
+    assert import_exports(conn, "Anna", csv_file) == len(df)
+
+    (count,) = conn.execute(
+        "SELECT COUNT(*) FROM activities WHERE dataset = 'Me'"
+    ).fetchone()
+    # Rows repeated within the export are kept, like load_data does
+    assert count == len(df)
+
+
+def test_get_activities(conn, df):
+    assert sql_get_activities(conn, "Me") == get_activities(df)
+    assert sql_get_activities(conn, "Nobody") == []
+
+
+def test_filter_activities(conn, df):
+    result = sql_filter_activities(conn, "Me", ["Löpning", "Yoga"])
+
+    expected = filter_activities(df, ["Löpning", "Yoga"])
+    assert result.index.equals(expected.index)
+    pd.testing.assert_frame_equal(
+        result[SUMMABLE_COLUMNS], expected[SUMMABLE_COLUMNS].astype("float64")
+    )
+
+
+@pytest.mark.parametrize(
+    "activities", [["Löpning"], ["Yoga"], ["Simbassäng", "Styrketräning"], []]
+)
+def test_get_summable_metrics(conn, df, activities):
+    expected = get_summable_metrics(filter_activities(df, activities))
+    if not activities:
+        expected = []
+
+    assert sql_get_summable_metrics(conn, "Me", activities) == expected
+
+
+@pytest.mark.parametrize("metric", ["Distans", "Tid", "Kalorier"])
+@pytest.mark.parametrize("freq", ["D", "W", "ME", "YE"])
+def test_aggregate_matches_aggregate_over_time(conn, df, metric, freq):
+    activities = ["Löpning", "Simbassäng"]
+
+    result = aggregate(conn, "Me", activities, metric, freq)
+
+    expected = aggregate_over_time(
+        select_metric_and_drop_zeros(filter_activities(df, activities), metric), freq
+    )
+    pd.testing.assert_series_equal(
+        result, expected, check_names=False, check_freq=False
+    )
+
+
+def test_daily_sums_has_one_row_per_day(conn):
+    sums = daily_sums(conn, "Me", ["Löpning"], "Distans")
+
+    assert sums.index.is_unique
+    assert (sums.index == sums.index.normalize()).all()
+    with pytest.raises(ValueError):
+        daily_sums(conn, "Me", ["Löpning"], "Namn")
+
+
+def test_queries_use_the_index(conn):
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT date(Datum), SUM(Distans) FROM activities"
+        " WHERE dataset = 'Me' AND Aktivitetstyp IN ('Löpning')"
+        " GROUP BY date(Datum)"
+    ).fetchall()
+
+    assert any("activities_type_datum" in row[-1] for row in plan)
+
+
+@pytest.mark.parametrize("freq", ["D", "W", "ME"])
+def test_compare_aggregate_matches_compare_rollup(conn, df, freq):
+    activities = ["Löpning", "Simbassäng"]
+    later = df.iloc[:20].copy()
+    import_exports(conn, "Anna", csv_file)
+    conn.execute(
+        "DELETE FROM activities WHERE dataset = 'Anna' AND Datum < ?",
+        [str(later.index.min())],
+    )
+
+    result = compare_aggregate(
+        conn, {"Me": "Me", "Anna": "Anna"}, activities, "Distans", freq
+    )
+
+    expected = compare_rollup(
+        {"Me": build_daily_cube(df), "Anna": build_daily_cube(later)},
+        activities,
+        "Distans",
+        freq,
+    )
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+
+def test_aggregate_without_activities(conn):
+    assert len(aggregate(conn, "Nobody", ["Löpning"], "Distans", "W")) == 0
+    assert (
+        len(compare_aggregate(conn, {"Nobody": "Nobody"}, ["Löpning"], "Distans", "W"))
+        == 0
+    )
+
+
+def test_database_imports_each_dataset_once(tmp_path, df):
+    db = ActivityDatabase(tmp_path / "activities.sqlite")
+    db.import_dataset("key", df)
+    # Skipped, even though these activities would be new
+    db.import_dataset("key", df.shift(1, freq="D"))
+
+    assert db.get_activities("key") == get_activities(df)
+    pd.testing.assert_series_equal(
+        db.aggregate("key", ["Löpning"], "Distans", "ME"),
+        aggregate_over_time(
+            select_metric_and_drop_zeros(filter_activities(df, ["Löpning"]), "Distans"),
+            "ME",
+        ),
+        check_names=False,
+        check_freq=False,
+    )
+    db.close()
+
+
+def test_datasets_of_one_athlete_are_kept_apart(tmp_path, df):
+    # Two sessions that both upload exports without a name prefix, so both
+    # datasets are the default athlete's
+    mine = Dataset("Me", "mine", df)
+    theirs = Dataset("Me", "theirs", df[df["Aktivitetstyp"] != "Yoga"].iloc[:30])
+    db = ActivityDatabase(tmp_path / "activities.sqlite")
+    db.import_dataset(mine.key, mine.df)
+    db.import_dataset(theirs.key, theirs.df)
+
+    for dataset in [mine, theirs]:
+        assert db.get_activities(dataset.key) == get_activities(dataset.df)
+        expected = dataset.df.loc[dataset.df["Aktivitetstyp"] == "Löpning", "Distans"]
+        assert db.aggregate(dataset.key, ["Löpning"], "Distans", "YE").sum() == (
+            pytest.approx(expected.sum())
+        )
+    db.close()
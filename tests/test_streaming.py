@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cube import build_daily_cube
+from load_data import load_data
+from metrics import build_metric_flags, get_days_without_activity
+from rest_days import build_rest_day_engine
+from streaming import load_daily_aggregates
+
+TEST_FILE = Path("tests/testfiles/activities.csv")
+
+
+def test_daily_aggregates_give_the_same_cube():
+    df = load_data(TEST_FILE)
+
+    daily = load_daily_aggregates(TEST_FILE, chunk_rows=97).df
+
+    full = build_daily_cube(df)
+    streamed = build_daily_cube(daily)
+    order = [full.activities.index(a) for a in streamed.activities]
+    assert streamed.days.equals(full.days)
+    assert streamed.metrics == full.metrics
+    np.testing.assert_allclose(streamed.values, full.values[:, order, :])
+
+
+def test_daily_aggregates_have_one_row_per_day_and_type():
+    daily = load_daily_aggregates(TEST_FILE, chunk_rows=50).df
+
+    keys = pd.MultiIndex.from_arrays([daily.index, daily["Aktivitetstyp"]])
+    assert keys.is_unique
+    assert daily.index.is_monotonic_increasing
+
+
+def test_metric_flags_survive_chunking():
+    df = load_data(TEST_FILE)
+
+    flags = load_daily_aggregates(TEST_FILE, chunk_rows=97).flags
+
+    expected = build_metric_flags(df)
+    pd.testing.assert_frame_equal(
+        flags.has_na.sort_index(), expected.has_na.sort_index()
+    )
+    pd.testing.assert_frame_equal(
+        flags.has_non_zero.sort_index(), expected.has_non_zero.sort_index()
+    )
+
+
+def test_rest_days_from_daily_aggregates():
+    df = load_data(TEST_FILE)
+    start, end = df.index.min(), df.index.max()
+
+    daily = load_daily_aggregates(TEST_FILE, chunk_rows=97).df
+
+    pd.testing.assert_index_equal(
+        get_days_without_activity(daily, start, end).index,
+        get_days_without_activity(df, start, end).index,
+    )
+    full = build_rest_day_engine(df)
+    streamed = build_rest_day_engine(daily)
+    for activity, mask in full.masks.items():
+        np.testing.assert_array_equal(streamed.masks[activity], mask)